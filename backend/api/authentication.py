@@ -0,0 +1,49 @@
+from django.core.exceptions import ValidationError
+from django.utils.crypto import constant_time_compare, salted_hmac
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.utils.user_cache import user_cache
+from recipes.constants import JWT_PASSWORD_CLAIM, JWT_VERSION_CLAIM
+
+
+def get_password_fingerprint(user):
+    return salted_hmac(JWT_PASSWORD_CLAIM, user.password).hexdigest()
+
+
+def get_access_token(user):
+    token = AccessToken.for_user(user)
+    token[JWT_PASSWORD_CLAIM] = get_password_fingerprint(user)
+    token[JWT_VERSION_CLAIM] = user.token_version
+    return token
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None or raw_token.count(b'.') != 2:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return self.get_user(validated_token), validated_token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = self.user_model._meta.pk.to_python(
+                validated_token[api_settings.USER_ID_CLAIM]
+            )
+        except (KeyError, ValidationError):
+            raise AuthenticationFailed('Токен не содержит пользователя.')
+        user = user_cache.get(user_id)
+        if user is None or not user.is_active:
+            raise AuthenticationFailed('Пользователь не найден.')
+        if not constant_time_compare(
+            validated_token.get(JWT_PASSWORD_CLAIM, ''),
+            get_password_fingerprint(user)
+        ) or validated_token.get(JWT_VERSION_CLAIM, 0) != user.token_version:
+            raise AuthenticationFailed('Токен больше не действителен.')
+        return user
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+
+@register()
+def check_short_link_key(app_configs, **kwargs):
+    if settings.SHORT_LINK_KEY:
+        return []
+    return [Error(
+        'Не задан SHORT_LINK_KEY.',
+        hint='Укажите постоянный секретный ключ в переменной окружения '
+             'SHORT_LINK_KEY: от него зависят все выданные короткие ссылки.',
+        id='api.E001',
+    )]
@@ -1,7 +1,33 @@
+from django import forms
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
 from rest_framework.filters import SearchFilter
 
-from recipes.models import Ingredient, Recipe
+from recipes.constants import (TAG_IDS_CACHE_KEY, TAG_IDS_CACHE_TIMEOUT,
+                               TAGS_MATCH_ALL, TAGS_MATCH_ANY)
+from recipes.models import Ingredient, Recipe, Tag
+
+
+def get_tag_ids(refresh=False):
+    tag_ids = None if refresh else cache.get(TAG_IDS_CACHE_KEY)
+    if tag_ids is None:
+        tag_ids = dict(Tag.objects.values_list('slug', 'id'))
+        cache.set(TAG_IDS_CACHE_KEY, tag_ids, TAG_IDS_CACHE_TIMEOUT)
+    return tag_ids
+
+
+def get_tag_choices():
+    return [(slug, slug) for slug in get_tag_ids()]
+
+
+class TagSlugField(forms.MultipleChoiceField):
+    def valid_value(self, value):
+        return value in get_tag_ids() or value in get_tag_ids(refresh=True)
+
+
+class TagSlugFilter(filters.MultipleChoiceFilter):
+    field_class = TagSlugField
 
 
 class IngredientFilter(SearchFilter):
@@ -13,8 +39,11 @@ class IngredientFilter(SearchFilter):
 
 
 class RecipeFilter(FilterSet):
-    tags = filters.AllValuesMultipleFilter(
-        field_name='tags__slug'
+    tags = TagSlugFilter(choices=get_tag_choices, method='filter_tags')
+    tags_match = filters.ChoiceFilter(
+        choices=((TAGS_MATCH_ANY, TAGS_MATCH_ANY),
+                 (TAGS_MATCH_ALL, TAGS_MATCH_ALL)),
+        method='filter_tags_match'
     )
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
@@ -23,7 +52,23 @@ class RecipeFilter(FilterSet):
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart',)
+        fields = ('tags', 'tags_match', 'author', 'is_favorited',
+                  'is_in_shopping_cart',)
+
+    def filter_tags(self, queryset, name, value):
+        tag_ids = get_tag_ids()
+        ids = {tag_ids[slug] for slug in value if slug in tag_ids}
+        recipe_tags = Recipe.tags.through.objects.filter(
+            recipe=OuterRef('pk')
+        )
+        if self.form.cleaned_data.get('tags_match') == TAGS_MATCH_ALL:
+            return queryset.filter(*(
+                Exists(recipe_tags.filter(tag_id=tag_id)) for tag_id in ids
+            ))
+        return queryset.filter(Exists(recipe_tags.filter(tag_id__in=ids)))
+
+    def filter_tags_match(self, queryset, name, value):
+        return queryset
 
     def filter_is_favorited(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
@@ -1,10 +1,60 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
-from recipes.constants import (DEFAULT_LIMIT_PAGINATION, MAX_LIMIT_PAGINATION,
-                               PAGE_SIZE_QUERY_PARAM)
+from recipes.constants import (CURSOR_PAGINATION_MODE,
+                               DEFAULT_LIMIT_PAGINATION, MAX_LIMIT_PAGINATION,
+                               PAGE_SIZE_QUERY_PARAM,
+                               PAGINATION_MODE_QUERY_PARAM)
 
 
 class UserPagination(PageNumberPagination):
     default_limit = DEFAULT_LIMIT_PAGINATION
     max_limit = MAX_LIMIT_PAGINATION
     page_size_query_param = PAGE_SIZE_QUERY_PARAM
+
+
+class RecipeCursorPagination(CursorPagination):
+    ordering = ('-pub_date', '-id')
+    page_size = DEFAULT_LIMIT_PAGINATION
+    page_size_query_param = PAGE_SIZE_QUERY_PARAM
+
+
+class FeedCursorPagination(RecipeCursorPagination):
+    ordering = ('-feed_date', '-id')
+
+
+class SubscriptionCursorPagination(RecipeCursorPagination):
+    ordering = ('username',)
+
+
+class CursorOptInPagination(UserPagination):
+    cursor_pagination_class = RecipeCursorPagination
+    cursor_paginator = None
+
+    def use_cursor(self, request):
+        return (
+            self.cursor_pagination_class.cursor_query_param
+            in request.query_params
+            or request.query_params.get(PAGINATION_MODE_QUERY_PARAM)
+            == CURSOR_PAGINATION_MODE
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_cursor(request):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request,
+                                                           view)
+        self.cursor_paginator = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class RecipePagination(CursorOptInPagination):
+    cursor_pagination_class = RecipeCursorPagination
+
+
+class SubscriptionPagination(CursorOptInPagination):
+    cursor_pagination_class = SubscriptionCursorPagination
@@ -0,0 +1,33 @@
+import json
+
+from django.utils.datastructures import MultiValueDict
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import DataAndFiles, MultiPartParser
+
+from recipes.constants import MULTIPART_JSON_FIELD
+
+
+class MultiPartJSONData(dict):
+    def copy(self):
+        return MultiPartJSONData(self)
+
+    def update(self, other=(), **kwargs):
+        if isinstance(other, MultiValueDict):
+            other = other.dict()
+        super().update(other, **kwargs)
+
+
+class MultiPartJSONParser(MultiPartParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        parsed = super().parse(stream, media_type, parser_context)
+        if MULTIPART_JSON_FIELD not in parsed.data:
+            return parsed
+        try:
+            data = json.loads(parsed.data[MULTIPART_JSON_FIELD])
+        except ValueError as exc:
+            raise ParseError(f'Некорректный JSON в поле '
+                             f'{MULTIPART_JSON_FIELD}: {exc}')
+        if not isinstance(data, dict):
+            raise ParseError(f'Поле {MULTIPART_JSON_FIELD} должно '
+                             'содержать JSON-объект.')
+        return DataAndFiles(MultiPartJSONData(data), parsed.files)
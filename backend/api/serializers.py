@@ -1,15 +1,53 @@
-from drf_extra_fields.fields import Base64ImageField
+from django.db import IntegrityError, transaction
+from django.db.models import Manager
+from django.urls import reverse
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
-
-from api.utils.base64_avatar_converter import Base64AvatarConverter
-from recipes.constants import COOKING_TIME_LIMIT, MAX_AMOUNT_LIMIT
+from rest_framework.settings import api_settings
+
+from api.utils import recipe_cache
+from api.utils.base64_avatar_converter import (Base64AvatarConverter,
+                                               Base64ImageConverter)
+from api.utils.image_variants import get_image_url
+from recipes.constants import (AVATAR_IMAGE, CARD_IMAGE, COOKING_TIME_LIMIT,
+                               FIELDS_QUERY_PARAM, MAX_AMOUNT_LIMIT,
+                               MIN_POSITIVE_VALUE, OMIT_QUERY_PARAM,
+                               ORIGINAL_IMAGE, RECIPE_BATCH_MAX_SIZE,
+                               RECIPES_LIMIT_QUERY_PARAM)
 from recipes.models import (Favorite, Ingredient, IngredientRecipe, Recipe,
-                            ShoppingCart, Tag)
+                            ShoppingCart, ShoppingListExport, Tag)
+from recipes.shopping_lists import (change_recipe_shopping_lists, lock_users,
+                                    recipe_amounts)
 from users.models import Follow, User
 
 
-class UserSerializer(serializers.ModelSerializer):
+class SparseFieldsSerializerMixin:
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        omit = kwargs.pop('omit', None)
+        super().__init__(*args, **kwargs)
+        errors = {
+            param: [f'Неизвестные поля: {", ".join(sorted(unknown))}.']
+            for param, unknown in (
+                (FIELDS_QUERY_PARAM, set(fields or ()) - set(self.fields)),
+                (OMIT_QUERY_PARAM, set(omit or ()) - set(self.fields)),
+            ) if unknown
+        }
+        if errors:
+            raise ValidationError(errors)
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name in omit or ():
+            self.fields.pop(name, None)
+
+    @property
+    def is_sparse(self):
+        return set(self.fields) != set(self.Meta.fields)
+
+
+class UserSerializer(SparseFieldsSerializerMixin,
+                     serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField()
     avatar = serializers.SerializerMethodField()
 
@@ -19,12 +57,18 @@ class UserSerializer(serializers.ModelSerializer):
                   'first_name', 'last_name', 'avatar', 'is_subscribed')
 
     def get_avatar(self, obj):
-        return obj.avatar.url if obj.avatar else None
+        return get_image_url(obj.avatar, AVATAR_IMAGE)
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
-        return (request and request.user.is_authenticated
-                and request.user.follower.filter(author=obj).exists())
+        if not (request and request.user.is_authenticated):
+            return False
+        subscriptions = self.context.get('subscriptions')
+        if subscriptions is not None:
+            return obj.id in subscriptions
+        return request.user.follower.filter(author=obj).exists()
 
 
 class UserCreateSerializer(serializers.ModelSerializer):
@@ -50,17 +94,19 @@ class UserCreateSerializer(serializers.ModelSerializer):
         return user
 
 
-class TokenCreateSerializer(serializers.ModelSerializer):
-
-    class Meta:
-        model = User
-        fields = ['email', 'password']
-        extra_kwargs = {'password': {'write_only': True}}
+class TokenCreateSerializer(serializers.Serializer):
+    email = serializers.EmailField()
+    password = serializers.CharField(write_only=True)
 
 
 class UserAvatarSetSerializer(serializers.ModelSerializer):
     avatar = Base64AvatarConverter()
 
+    def update(self, instance, validated_data):
+        instance.avatar = validated_data['avatar']
+        instance.save(update_fields=('avatar',))
+        return instance
+
     def to_representation(self, instance):
         return {'avatar': instance.avatar.url}
 
@@ -85,7 +131,8 @@ class RecipeBaseSerializer(serializers.ModelSerializer):
     image = serializers.SerializerMethodField(read_only=True)
 
     def get_image(self, obj):
-        return obj.image.url if obj.image else None
+        return get_image_url(obj.image,
+                             self.context.get('image_size', CARD_IMAGE))
 
     class Meta:
         model = Recipe
@@ -93,19 +140,19 @@ class RecipeBaseSerializer(serializers.ModelSerializer):
 
 
 class SubscribeSerializer(UserSerializer):
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField()
     recipes = serializers.SerializerMethodField()
 
     class Meta(UserSerializer.Meta):
         fields = UserSerializer.Meta.fields + ('recipes_count', 'recipes')
         read_only_fields = ('email', 'username', 'first_name', 'last_name')
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
     def get_recipes(self, obj):
+        if hasattr(obj, 'limited_recipes'):
+            return RecipeBaseSerializer(obj.limited_recipes, many=True,
+                                        context=self.context).data
         request = self.context.get('request')
-        limit = request.GET.get('recipes_limit')
+        limit = request.GET.get(RECIPES_LIMIT_QUERY_PARAM)
         recipes = obj.recipes.all()
         if limit and limit.isdigit():
             recipes = recipes[:int(limit)]
@@ -118,15 +165,20 @@ class SubscribeActionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Follow
         fields = ('user', 'author')
+        validators = []
 
-    def validate(self, data):
-        user = data['user']
-        author = data['author']
-        if Follow.objects.filter(user=user, author=author).exists():
-            raise ValidationError("You are already following this user.")
-        if user == author:
-            raise ValidationError("You cannot subscribe to yourself.")
-        return data
+    def create(self, validated_data):
+        if validated_data['user'] == validated_data['author']:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                "You cannot subscribe to yourself."
+            ]})
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                "You are already following this user."
+            ]})
 
     def to_representation(self, instance):
         return SubscribeSerializer(instance.author, context=self.context).data
@@ -155,7 +207,14 @@ class IngredientRecipeSerializer(serializers.ModelSerializer):
         return amount
 
 
-class RecipeInfoSerializer(serializers.ModelSerializer):
+class RecipeInfoListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        recipes = data.all() if isinstance(data, Manager) else data
+        return self.child.to_cached_representation(list(recipes))
+
+
+class RecipeInfoSerializer(SparseFieldsSerializerMixin,
+                           serializers.ModelSerializer):
     tags = TagSerializer(many=True)
     author = UserSerializer(read_only=True)
     ingredients = IngredientRecipeSerializer(many=True,
@@ -176,20 +235,56 @@ class RecipeInfoSerializer(serializers.ModelSerializer):
                   'image',
                   'cooking_time',
                   'text')
+        list_serializer_class = RecipeInfoListSerializer
+
+    def to_representation(self, instance):
+        return self.to_cached_representation([instance])[0]
+
+    def to_cached_representation(self, recipes):
+        if self.is_sparse:
+            return [super(RecipeInfoSerializer, self).to_representation(recipe)
+                    for recipe in recipes]
+        image_size = self.context.get('image_size', ORIGINAL_IMAGE)
+        cached = recipe_cache.get_many(recipes, image_size)
+        missed = {}
+        representations = []
+        for recipe in recipes:
+            data = cached.get(recipe.pk)
+            if data is None:
+                data = missed[recipe] = super().to_representation(recipe)
+            else:
+                self.set_per_user_fields(recipe, data)
+            representations.append(data)
+        if missed:
+            recipe_cache.set_many(missed, image_size)
+        return representations
+
+    def set_per_user_fields(self, recipe, data):
+        data['is_favorited'] = self.get_is_favorited(recipe)
+        data['is_in_shopping_cart'] = self.get_is_in_shopping_cart(recipe)
+        data['author']['is_subscribed'] = (
+            self.fields['author'].get_is_subscribed(recipe.author)
+        )
 
     def get_image(self, obj):
-        return obj.image.url if obj.image else ""
+        return get_image_url(
+            obj.image, self.context.get('image_size', ORIGINAL_IMAGE)
+        ) or ""
 
     def get_ingredients(self, obj):
         ingredients = IngredientRecipe.objects.filter(recipe=obj)
         return IngredientRecipeSerializer(ingredients, many=True).data
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
         return (request and request.user.is_authenticated
                 and obj.favorites.filter(user=request.user).exists())
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context.get('request')
         return (request and request.user.is_authenticated
                 and obj.shopping_carts.filter(user=request.user).exists())
@@ -202,7 +297,7 @@ class RecipeCreateSerializer(RecipeInfoSerializer):
     )
     ingredients = IngredientRecipeSerializer(many=True,
                                              required=True)
-    image = Base64ImageField()
+    image = Base64ImageConverter()
     author = UserSerializer(read_only=True)
     cooking_time = serializers.IntegerField()
     text = serializers.CharField()
@@ -227,6 +322,7 @@ class RecipeCreateSerializer(RecipeInfoSerializer):
             ) for ingredient in ingredients
         )
 
+    @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
@@ -236,12 +332,15 @@ class RecipeCreateSerializer(RecipeInfoSerializer):
         self.set_ingredients(ingredients, recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
+        old_amounts = recipe_amounts(instance.pk)
         instance.tags.clear()
         IngredientRecipe.objects.filter(recipe=instance).delete()
         instance.tags.set(validated_data.pop('tags'))
         ingredients = validated_data.pop('ingredients')
         self.set_ingredients(ingredients, instance)
+        change_recipe_shopping_lists(instance.pk, old_amounts)
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
@@ -298,16 +397,19 @@ class RecipeCreateSerializer(RecipeInfoSerializer):
 
 
 class BaseRecipeActionSerializer(serializers.ModelSerializer):
-    def validate(self, data):
-        user = data['user']
-        if self.Meta.model.objects.filter(user=user,
-                                          recipe=data['recipe']).exists():
-            raise serializers.ValidationError(
-                'Рецепт уже добавлен в избранное.'
-                if self.Meta.model == Favorite
-                else 'Рецепт уже добавлен в корзину.'
-            )
-        return data
+    def create(self, validated_data):
+        try:
+            with transaction.atomic():
+                lock_users((validated_data['user'].pk,))
+                return super().create(validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    'Рецепт уже добавлен в избранное.'
+                    if self.Meta.model == Favorite
+                    else 'Рецепт уже добавлен в корзину.'
+                ]
+            })
 
     def to_representation(self, instance):
         return RecipeBaseSerializer(
@@ -320,9 +422,35 @@ class FavoriteSerializer(BaseRecipeActionSerializer):
     class Meta:
         model = Favorite
         fields = ('user', 'recipe')
+        validators = []
 
 
 class ShoppingCartSerializer(BaseRecipeActionSerializer):
     class Meta:
         model = ShoppingCart
         fields = ('user', 'recipe')
+        validators = []
+
+
+class RecipeBatchSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=MIN_POSITIVE_VALUE),
+        allow_empty=False,
+        max_length=RECIPE_BATCH_MAX_SIZE
+    )
+
+    def validate_recipes(self, value):
+        return list(dict.fromkeys(value))
+
+
+class ShoppingListExportSerializer(serializers.ModelSerializer):
+    url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ShoppingListExport
+        fields = ('id', 'status', 'created_at', 'updated_at', 'url')
+
+    def get_url(self, obj):
+        return self.context['request'].build_absolute_uri(reverse(
+            'api:recipes-shopping-cart-export', kwargs={'job_id': obj.pk}
+        ))
@@ -0,0 +1,58 @@
+from functools import partial
+
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from api.utils.catalog_snapshot import ingredient_snapshot, tag_snapshot
+from api.utils.image_variants import generate_variants
+from api.utils.ingredient_index import ingredient_index
+from api.utils.user_cache import user_cache
+from recipes.constants import AVATAR_IMAGE_VARIANTS, RECIPE_IMAGE_VARIANTS
+from recipes.models import Ingredient, Recipe, Tag, User
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_catalog(sender, **kwargs):
+    ingredient_index.invalidate()
+    ingredient_snapshot.invalidate()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_catalog(sender, **kwargs):
+    tag_snapshot.invalidate()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    user_cache.invalidate(instance.pk)
+
+
+def refresh_recipes(filters, future):
+    try:
+        if future.exception() is None:
+            Recipe.objects.filter(**filters).update(updated_at=timezone.now())
+    finally:
+        connection.close()
+
+
+@receiver(post_save, sender=Recipe)
+def generate_recipe_image_variants(sender, instance, **kwargs):
+    if instance.image:
+        transaction.on_commit(partial(
+            generate_variants, instance.image.name, RECIPE_IMAGE_VARIANTS,
+            partial(refresh_recipes, {'pk': instance.pk})
+        ))
+
+
+@receiver(post_save, sender=User)
+def generate_avatar_variants(sender, instance, **kwargs):
+    if instance.avatar:
+        transaction.on_commit(partial(
+            generate_variants, instance.avatar.name, AVATAR_IMAGE_VARIANTS,
+            partial(refresh_recipes, {'author': instance.pk})
+        ))
@@ -0,0 +1,1070 @@
+import gzip
+import json
+import os
+import re
+from base64 import b64encode
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from threading import Barrier
+
+import brotli
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.test import (TestCase, TransactionTestCase, override_settings,
+                         skipUnlessDBFeature)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from api.utils.base64_avatar_converter import (Base64AvatarConverter,
+                                               Base64ImageConverter)
+from api.utils.catalog_snapshot import ingredient_snapshot, tag_snapshot
+from api.utils.export_jobs import (get_cart_hash, get_shopping_list_lines,
+                                   purge_exports)
+from api.utils.image_variants import get_image_url, write_variants
+from api.utils.ingredient_index import ingredient_index
+from api.utils.short_links import (MAX_RECIPE_ID, decode_short_link,
+                                   encode_short_link)
+from api.utils.user_cache import user_cache
+from recipes.constants import (AVATAR_MAX_SIZE, CARD_IMAGE, IMAGE_VARIANTS,
+                               ORIGINAL_IMAGE, SHORT_LINK_LENGTH)
+from recipes.models import (Favorite, Ingredient, IngredientRecipe, Recipe,
+                            ShoppingCart, ShoppingListExport, ShoppingListItem,
+                            ShortLink, StoredFile, Tag, TimelineEntry)
+from recipes.shopping_lists import shopping_list_items, shopping_list_totals
+from recipes.storage import get_variant_name
+from recipes.user_recipes import insert_user_recipes
+from users.models import Follow, User
+
+SEQUENTIAL_SCANS = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'^SCAN (\S+)$'),
+}
+SQLITE_SUBQUERIES = re.compile(r'^(?:CO-ROUTINE|MATERIALIZE) (\S+)')
+SQL_ALIASES = re.compile(r'"(\w+)" ([A-Z]\d+)\b')
+SKIPPED_STATEMENTS = ('SAVEPOINT', 'RELEASE', 'ROLLBACK', 'BEGIN', 'SET')
+
+
+def get_statements(context):
+    return [
+        query['sql'] for query in context.captured_queries
+        if not query['sql'].lstrip().upper().startswith(SKIPPED_STATEMENTS)
+    ]
+
+
+class SeededDataMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {number}', measurement_unit='г')
+            for number in range(30)
+        )
+        cls.tags = [
+            Tag.objects.create(name=f'Тег {number}', slug=f'tag{number}')
+            for number in range(5)
+        ]
+        cls.users = [
+            User.objects.create_user(
+                username=f'user{number}', email=f'user{number}@example.com',
+                password='Pass-12345', first_name='Имя', last_name='Фамилия'
+            )
+            for number in range(12)
+        ]
+        cls.recipes = []
+        for number in range(40):
+            recipe = Recipe.objects.create(
+                author=cls.users[number % len(cls.users)],
+                name=f'Рецепт {number}', text='Описание', cooking_time=5,
+                image='recipes/image.png'
+            )
+            recipe.tags.set(cls.tags[:number % len(cls.tags) + 1])
+            IngredientRecipe.objects.bulk_create(
+                IngredientRecipe(
+                    recipe=recipe,
+                    ingredient=cls.ingredients[
+                        (number + offset) % len(cls.ingredients)
+                    ],
+                    amount=offset + 1
+                )
+                for offset in range(4)
+            )
+            cls.recipes.append(recipe)
+        cls.user = cls.users[0]
+        for author in cls.users[1:6]:
+            Follow.objects.create(user=cls.user, author=author)
+        for recipe in cls.recipes[:10]:
+            Favorite.objects.create(user=cls.user, recipe=recipe)
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    def setUp(self):
+        caches[settings.RECIPE_CACHE_ALIAS].clear()
+        caches['default'].clear()
+        ingredient_index.invalidate()
+        ingredient_snapshot.invalidate()
+        tag_snapshot.invalidate()
+        self.anonymous_client = APIClient()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+
+class ExplainTests(SeededDataMixin, TestCase):
+    catalog_tables = {'recipes_tag'}
+
+    def setUp(self):
+        super().setUp()
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def get_plan(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(f'EXPLAIN {sql}')
+                return [row[0] for row in cursor.fetchall()]
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[3] for row in cursor.fetchall()]
+
+    def get_scanned_tables(self, sql):
+        plan = self.get_plan(sql)
+        aliases = dict(
+            (alias, table) for table, alias in SQL_ALIASES.findall(sql)
+        )
+        subqueries = {
+            match[1] for line in plan
+            if (match := SQLITE_SUBQUERIES.match(line))
+        }
+        pattern = SEQUENTIAL_SCANS[connection.vendor]
+        return {
+            aliases.get(match[1], match[1]) for line in plan
+            if (match := pattern.search(line.strip()))
+            and match[1] not in subqueries
+            and not match[1].startswith('(')
+            and not match[1].endswith(('CONSTANT ROW', 'CONSTANT ROWS'))
+        } - self.catalog_tables
+
+    def assertNoSequentialScans(self, client, method, url, data=None):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(client, method)(url, data, format='json')
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 400, url)
+        statements = get_statements(context)
+        self.assertTrue(statements, url)
+        for sql in statements:
+            with self.subTest(url=url, sql=sql):
+                self.assertEqual(self.get_scanned_tables(sql), set())
+
+    def test_recipe_reads(self):
+        recipe = self.recipes[-1]
+        urls = (
+            '/api/recipes/',
+            '/api/recipes/?pagination=cursor',
+            f'/api/recipes/?author={self.users[1].pk}',
+            '/api/recipes/?tags=tag1&tags=tag2',
+            '/api/recipes/?tags=tag1&tags=tag2&tags_match=all',
+            '/api/recipes/?is_favorited=1',
+            '/api/recipes/?is_in_shopping_cart=1',
+            f'/api/recipes/{recipe.pk}/',
+            '/api/recipes/feed/',
+            '/api/recipes/feed/?strategy=write',
+            '/api/recipes/download_shopping_cart/?format=txt',
+        )
+        for url in urls:
+            self.assertNoSequentialScans(self.client, 'get', url)
+        self.assertNoSequentialScans(self.anonymous_client, 'get',
+                                     '/api/recipes/')
+
+    def test_user_reads(self):
+        urls = (
+            '/api/users/',
+            f'/api/users/{self.users[1].pk}/',
+            '/api/users/me/',
+            '/api/users/subscriptions/?recipes_limit=2',
+        )
+        for url in urls:
+            self.assertNoSequentialScans(self.client, 'get', url)
+
+    def test_toggles(self):
+        recipe = self.recipes[-1]
+        author = self.users[8]
+        for method in ('post', 'delete'):
+            self.assertNoSequentialScans(
+                self.client, method, f'/api/recipes/{recipe.pk}/favorite/'
+            )
+            self.assertNoSequentialScans(
+                self.client, method,
+                f'/api/recipes/{recipe.pk}/shopping_cart/'
+            )
+            self.assertNoSequentialScans(
+                self.client, method, f'/api/users/{author.pk}/subscribe/'
+            )
+            self.assertNoSequentialScans(
+                self.client, method, '/api/recipes/shopping_cart/',
+                {'recipes': [recipe.pk, self.recipes[-2].pk]}
+            )
+
+
+class QueryBudgetTests(SeededDataMixin, TestCase):
+    anonymous_budget = 4
+    authenticated_budget = 5
+
+    def get_budgets(self):
+        return ((self.anonymous_client, self.anonymous_budget),
+                (self.client, self.authenticated_budget))
+
+    def test_recipe_list_budget(self):
+        for client, budget in self.get_budgets():
+            for limit in (2, 10):
+                caches[settings.RECIPE_CACHE_ALIAS].clear()
+                with self.subTest(client=client, limit=limit):
+                    with self.assertNumQueries(budget):
+                        response = client.get(f'/api/recipes/?limit={limit}')
+                    self.assertEqual(len(response.data['results']), limit)
+
+    def test_recipe_list_budget_with_warm_cache(self):
+        for client, budget in self.get_budgets():
+            client.get('/api/recipes/?limit=10')
+            with self.subTest(client=client):
+                with self.assertNumQueries(budget):
+                    client.get('/api/recipes/?limit=10')
+
+    def test_recipe_detail_budget(self):
+        for client, budget in self.get_budgets():
+            for recipe in (self.recipes[0], self.recipes[-1]):
+                with self.subTest(client=client, recipe=recipe.pk):
+                    with self.assertNumQueries(budget):
+                        response = client.get(f'/api/recipes/{recipe.pk}/')
+                    self.assertEqual(response.data['id'], recipe.pk)
+
+
+class SparseFieldsTests(SeededDataMixin, TestCase):
+    def test_requested_fields(self):
+        for url, params, keys in (
+            ('/api/recipes/', {'fields': 'id,name'}, {'id', 'name'}),
+            (f'/api/recipes/{self.recipes[0].pk}/', {'fields': 'id, tags'},
+             {'id', 'tags'}),
+            ('/api/users/', {'fields': 'id,username'}, {'id', 'username'}),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 200)
+                data = response.json()
+                for item in data.get('results', [data]):
+                    self.assertEqual(set(item), keys)
+        item = self.client.get('/api/recipes/',
+                               {'omit': 'text'}).json()['results'][0]
+        self.assertNotIn('text', item)
+        self.assertIn('name', item)
+
+    def test_unknown_fields(self):
+        for url in ('/api/recipes/', f'/api/recipes/{self.recipes[0].pk}/',
+                    '/api/users/'):
+            for param in ('fields', 'omit'):
+                with self.subTest(url=url, param=param):
+                    response = self.client.get(url, {param: 'id,bogus,zzz'})
+                    self.assertEqual(response.status_code, 400)
+                    message, = response.json()[param]
+                    self.assertIn('bogus, zzz', message)
+                    self.assertNotIn('id', message)
+
+
+class IngredientSearchTests(TestCase):
+    names = ('Соль', 'соль морская', 'Сольянка', 'СОЛОД', 'Сахар', 'сало',
+             'Ёрш', 'ёлка', 'Apple', 'apricot', 'APPLE JUICE')
+    queries = ('соль', 'СОЛ', 'Сол', 'са', 'ё', 'Ё', 'ap', 'APP', ' apple ',
+               'нет такого')
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit='г') for name in cls.names
+        )
+
+    def setUp(self):
+        ingredient_index.invalidate()
+        ingredient_snapshot.invalidate()
+        self.client = APIClient()
+
+    def get_names(self, query, **params):
+        response = self.client.get('/api/ingredients/',
+                                   {'name': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [row['name'] for row in response.data]
+
+    def test_index_matches_database_fallback(self):
+        for query in self.queries:
+            with self.subTest(query=query):
+                if connection.vendor == 'sqlite' and not query.isascii():
+                    self.skipTest('SQLite LIKE folds only ASCII letters')
+                with override_settings(INGREDIENT_PREFIX_INDEX=False):
+                    expected = self.get_names(query.strip())
+                self.assertCountEqual(self.get_names(query), expected)
+                self.assertCountEqual(
+                    [row['name'] for row in ingredient_index.search(query)],
+                    expected
+                )
+
+    def test_cyrillic_case_folding(self):
+        for query in self.queries:
+            with self.subTest(query=query):
+                self.assertCountEqual(
+                    self.get_names(query),
+                    [name for name in self.names if name.casefold()
+                     .startswith(query.strip().casefold())]
+                )
+
+    def test_ranking(self):
+        self.assertEqual(self.get_names('СОЛЬ'),
+                         ['Соль', 'Сольянка', 'соль морская'])
+        self.assertEqual(self.get_names('apple'), ['Apple', 'APPLE JUICE'])
+        self.assertEqual(self.get_names('ё'), ['Ёрш', 'ёлка'])
+
+    def test_blank_query_is_unfiltered(self):
+        expected = [row['name']
+                    for row in self.client.get('/api/ingredients/').json()]
+        for query in ('', ' ', '  \t'):
+            for enabled in (True, False):
+                with self.subTest(query=query, enabled=enabled):
+                    with override_settings(INGREDIENT_PREFIX_INDEX=enabled):
+                        self.assertEqual(self.get_names(query), expected)
+
+    def test_limit(self):
+        ranked = self.get_names('с')
+        for limit in (1, 3, len(ranked), len(ranked) + 5):
+            with self.subTest(limit=limit):
+                self.assertEqual(self.get_names('с', limit=limit),
+                                 ranked[:limit])
+                self.assertEqual(
+                    [row['name']
+                     for row in ingredient_index.search('С', limit)],
+                    ranked[:limit]
+                )
+
+
+class AuthenticationTests(TestCase):
+    password = 'Pass-12345'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@example.com',
+            password=cls.password, first_name='Имя', last_name='Фамилия'
+        )
+
+    def setUp(self):
+        user_cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=self.login())
+
+    def login(self):
+        response = APIClient().post('/api/auth/token/login/', {
+            'email': self.user.email, 'password': self.password
+        }, format='json')
+        return f'Bearer {response.data["auth_token"]}'
+
+    def test_logout_revokes_token(self):
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+        response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+
+    @override_settings(AUTH_USER_CACHE_TTL=3600)
+    def test_logout_invalidates_cached_user(self):
+        other = APIClient()
+        other.credentials(HTTP_AUTHORIZATION=self.login())
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+        self.assertEqual(user_cache.get(self.user.pk).token_version, 0)
+        self.assertEqual(self.client.post('/api/auth/token/logout/')
+                         .status_code, 204)
+        with self.assertNumQueries(1):
+            self.assertEqual(other.get('/api/users/me/').status_code, 401)
+        self.assertEqual(user_cache.get(self.user.pk).token_version, 1)
+        self.client.credentials(HTTP_AUTHORIZATION=self.login())
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+
+    def test_writes_do_not_restore_cached_fields(self):
+        self.client.get('/api/users/me/')
+        User.objects.filter(pk=self.user.pk).update(followers_count=7)
+        response = self.client.delete('/api/users/me/avatar/')
+        self.assertEqual(response.status_code, 204)
+        response = self.client.post('/api/users/set_password/', {
+            'current_password': self.password,
+            'new_password': 'New-pass-12345',
+        }, format='json')
+        self.assertEqual(response.status_code, 204)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.followers_count, 7)
+        self.assertTrue(self.user.check_password('New-pass-12345'))
+
+
+class UserRecipesTests(SeededDataMixin, TestCase):
+    def get_counts(self, *recipes):
+        return list(
+            Recipe.objects.filter(pk__in=[recipe.pk for recipe in recipes])
+            .order_by('pk').values_list('favorites_count',
+                                        'shopping_cart_count')
+        )
+
+    def test_batch_add_counts_only_inserted(self):
+        first, second = self.recipes[-2:]
+        self.client.post(f'/api/recipes/{first.pk}/favorite/')
+        response = self.client.post('/api/recipes/favorite/', {
+            'recipes': [first.pk, second.pk]
+        }, format='json')
+        self.assertEqual(
+            [row['status'] for row in response.data['results']],
+            ['already_added', 'added']
+        )
+        self.assertEqual(self.get_counts(first, second), [(1, 0), (1, 0)])
+
+    def test_insert_skips_existing_rows(self):
+        first, second = self.recipes[-2:]
+        Favorite.objects.create(user=self.user, recipe=first)
+        self.assertEqual(
+            insert_user_recipes(Favorite, self.user, [first.pk, second.pk]),
+            [second.pk]
+        )
+        self.assertEqual(
+            Favorite.objects.filter(user=self.user,
+                                    recipe__in=(first, second)).count(),
+            2
+        )
+
+
+class CountersMixin:
+    def assertCountersConsistent(self):
+        self.assertEqual(
+            shopping_list_items(ShoppingListItem),
+            shopping_list_totals(IngredientRecipe)
+        )
+        for recipe in Recipe.objects.annotate(
+            favorite_rows=Count('favorites', distinct=True),
+            shopping_cart_rows=Count('shopping_carts', distinct=True)
+        ):
+            self.assertEqual(
+                (recipe.favorites_count, recipe.shopping_cart_count),
+                (recipe.favorite_rows, recipe.shopping_cart_rows)
+            )
+        for user in User.objects.annotate(follower_rows=Count('following')):
+            self.assertEqual(user.followers_count, user.follower_rows)
+
+
+class BatchRemoveTests(CountersMixin, SeededDataMixin, TestCase):
+    budget = 15
+
+    def remove(self, recipes):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.delete('/api/recipes/shopping_cart/', {
+                'recipes': [recipe.pk for recipe in recipes]
+            }, format='json')
+        self.assertEqual(
+            {row['status'] for row in response.data['results']}, {'removed'}
+        )
+        return len(context.captured_queries)
+
+    def test_queries_do_not_grow_with_batch_size(self):
+        for recipes in (self.recipes[:2], self.recipes[2:10]):
+            with self.subTest(size=len(recipes)):
+                self.assertLessEqual(self.remove(recipes), self.budget)
+        self.assertCountersConsistent()
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrencyTests(CountersMixin, TransactionTestCase):
+    threads = 8
+
+    def setUp(self):
+        self.user, self.author = (
+            User.objects.create_user(
+                username=name, email=f'{name}@example.com',
+                password='Pass-12345', first_name='Имя', last_name='Фамилия'
+            )
+            for name in ('reader', 'author')
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {number}', measurement_unit='г')
+            for number in range(3)
+        )
+        self.recipes = []
+        for number in range(3):
+            recipe = Recipe.objects.create(
+                author=self.author, name=f'Рецепт {number}', text='Описание',
+                cooking_time=5, image='recipes/image.png'
+            )
+            IngredientRecipe.objects.bulk_create(
+                IngredientRecipe(recipe=recipe, ingredient=ingredient,
+                                 amount=number + 1)
+                for ingredient in ingredients[number:]
+            )
+            self.recipes.append(recipe)
+
+    def run_concurrently(self, requests):
+        barrier = Barrier(len(requests), timeout=30)
+
+        def send(request):
+            method, url, data = request
+            client = APIClient()
+            client.force_authenticate(self.user)
+            try:
+                barrier.wait()
+                return getattr(client, method)(url, data,
+                                               format='json').status_code
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(len(requests)) as executor:
+            return list(executor.map(send, requests))
+
+    def test_identical_toggles(self):
+        recipe = self.recipes[0]
+        for url in (f'/api/recipes/{recipe.pk}/favorite/',
+                    f'/api/recipes/{recipe.pk}/shopping_cart/',
+                    f'/api/users/{self.author.pk}/subscribe/'):
+            for method, status in (('post', 201), ('delete', 204)):
+                with self.subTest(url=url, method=method):
+                    codes = self.run_concurrently(
+                        [(method, url, None)] * self.threads
+                    )
+                    self.assertEqual(codes.count(status), 1)
+                    self.assertEqual(codes.count(400), self.threads - 1)
+                    self.assertCountersConsistent()
+
+    def test_mixed_single_and_batch_changes(self):
+        requests = []
+        for recipe in self.recipes:
+            for path in ('favorite', 'shopping_cart'):
+                requests += [
+                    ('post', f'/api/recipes/{recipe.pk}/{path}/', None),
+                    ('delete', f'/api/recipes/{recipe.pk}/{path}/', None),
+                ]
+        for path in ('favorite', 'shopping_cart'):
+            for method in ('post', 'delete'):
+                requests.append((method, f'/api/recipes/{path}/', {
+                    'recipes': [recipe.pk for recipe in self.recipes]
+                }))
+        for _ in range(3):
+            codes = self.run_concurrently(requests)
+            self.assertNotIn(500, codes)
+            self.assertCountersConsistent()
+
+
+class TimelineTests(SeededDataMixin, TestCase):
+    def get_feed_ids(self):
+        response = self.client.get('/api/recipes/feed/',
+                                   {'strategy': 'write', 'limit': 100})
+        self.assertEqual(response.status_code, 200)
+        return {recipe['id'] for recipe in response.json()['results']}
+
+    def get_recipe_ids(self, *authors):
+        return set(Recipe.objects.filter(author__in=authors)
+                   .values_list('pk', flat=True))
+
+    def test_new_recipe_is_fanned_out_to_followers(self):
+        author = self.users[1]
+        recipe = Recipe.objects.create(author=author, name='Новый',
+                                       text='Описание', cooking_time=5)
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(recipe=recipe)
+                .values_list('user_id', flat=True)),
+            {self.user.pk}
+        )
+        self.assertIn(recipe.pk, self.get_feed_ids())
+
+    def test_follow_backfills_and_unfollow_clears(self):
+        author = self.users[7]
+        followed = self.users[1:6]
+        self.assertEqual(self.get_feed_ids(), self.get_recipe_ids(*followed))
+        response = self.client.post(f'/api/users/{author.pk}/subscribe/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.get_feed_ids(),
+                         self.get_recipe_ids(author, *followed))
+        response = self.client.delete(f'/api/users/{author.pk}/subscribe/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.get_feed_ids(), self.get_recipe_ids(*followed))
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.user, author=author
+        ).exists())
+
+
+class ShoppingListExportTests(SeededDataMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.export_root = Path(directory.name)
+        storages_setting = {**settings.STORAGES, 'exports': {
+            **settings.STORAGES['exports'],
+            'OPTIONS': {'location': directory.name, 'base_url': None},
+        }}
+        override = override_settings(STORAGES=storages_setting)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def download(self, client=None, **params):
+        response = (client or self.client).get(
+            '/api/recipes/download_shopping_cart/',
+            {'format': 'pdf', **params}
+        )
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def test_files_are_kept_outside_media_root(self):
+        self.assertEqual(self.download().status_code, 200)
+        self.assertEqual(len(list(self.export_root.glob('*.pdf'))), 1)
+        self.assertFalse(Path(settings.EXPORT_ROOT).resolve().is_relative_to(
+            Path(settings.MEDIA_ROOT).resolve()
+        ))
+
+    def test_async_repeat_reuses_done_job(self):
+        self.download()
+        for _ in range(2):
+            response = self.download(mode='async')
+            self.assertEqual(response.status_code, 302)
+        job = ShoppingListExport.objects.get(user=self.user)
+        self.assertEqual(job.status, ShoppingListExport.Status.DONE)
+        self.assertTrue(response.url.endswith(
+            f'/api/recipes/download_shopping_cart/{job.pk}/'
+        ))
+        self.assertEqual(self.client.get(response.url).status_code, 200)
+
+    def test_non_file_responses_are_json(self):
+        lines = get_shopping_list_lines(self.user)
+        ShoppingListExport.objects.create(user=self.user,
+                                          cart_hash=get_cart_hash(lines))
+        for response, status in ((self.download(self.anonymous_client), 401),
+                                 (self.download(mode='async'), 202)):
+            with self.subTest(status=status):
+                self.assertEqual(response.status_code, status)
+                self.assertEqual(response['Content-Type'],
+                                 'application/json')
+                self.assertIsInstance(response.json(), dict)
+
+    def test_purge_removes_old_files_only(self):
+        self.download()
+        old, = self.export_root.glob('*.pdf')
+        fresh = self.export_root / f'{"0" * 64}.pdf'
+        fresh.write_bytes(b'%PDF')
+        stamp = (timezone.now() - timedelta(days=2)).timestamp()
+        os.utime(old, (stamp, stamp))
+        self.assertEqual(purge_exports(days=1), (0, 1))
+        self.assertEqual(list(self.export_root.glob('*.pdf')), [fresh])
+
+
+@override_settings(SHORT_LINK_KEY='short-link-test-key')
+class ShortLinkTests(SeededDataMixin, TestCase):
+    def test_round_trip(self):
+        for recipe_id in (1, 2, 1000, MAX_RECIPE_ID):
+            with self.subTest(recipe_id=recipe_id):
+                link = encode_short_link(recipe_id)
+                self.assertEqual(len(link), SHORT_LINK_LENGTH)
+                self.assertEqual(decode_short_link(link), recipe_id)
+
+    def test_other_key_is_rejected(self):
+        links = [encode_short_link(recipe_id) for recipe_id in range(1, 201)]
+        with override_settings(SHORT_LINK_KEY='another-key'):
+            decoded = [decode_short_link(link) for link in links]
+        self.assertLessEqual(len(decoded) - decoded.count(None), 2)
+
+    def test_redirect(self):
+        recipe = self.recipes[0]
+        ShortLink.objects.create(recipe=recipe, link='abcde')
+        with override_settings(SHORT_LINK_KEY='another-key'):
+            foreign = encode_short_link(recipe.pk)
+        for link, status in ((encode_short_link(recipe.pk), 302),
+                             ('abcde', 302), (foreign, 404)):
+            with self.subTest(link=link):
+                response = self.anonymous_client.get(
+                    f'/s/{link}/', HTTP_HOST='testserver'
+                )
+                self.assertEqual(response.status_code, status)
+                if status == 302:
+                    self.assertTrue(response.url.endswith(
+                        f'/recipes/{recipe.pk}/'
+                    ))
+
+
+class ConditionalGetTests(SeededDataMixin, TestCase):
+    def get_recipe(self, recipe, **headers):
+        return self.anonymous_client.get(f'/api/recipes/{recipe.pk}/',
+                                         **headers)
+
+    def assertChanged(self, recipe, etag):
+        response = self.get_recipe(recipe, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        return response
+
+    def test_ingredient_row_change(self):
+        recipe = self.recipes[0]
+        etag = self.get_recipe(recipe)['ETag']
+        self.assertEqual(
+            self.get_recipe(recipe, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        row = IngredientRecipe.objects.filter(recipe=recipe).first()
+        row.amount += 1
+        row.save()
+        response = self.assertChanged(recipe, etag)
+        self.assertIn(row.amount, [
+            ingredient['amount']
+            for ingredient in response.json()['ingredients']
+        ])
+
+    def test_ingredient_row_move_and_delete(self):
+        source, target = self.recipes[:2]
+        etags = {recipe: self.get_recipe(recipe)['ETag']
+                 for recipe in (source, target)}
+        row = IngredientRecipe.objects.filter(recipe=source).first()
+        row.recipe = target
+        row.save()
+        for recipe, etag in etags.items():
+            with self.subTest(recipe=recipe.pk):
+                etags[recipe] = self.assertChanged(recipe, etag)['ETag']
+        row.delete()
+        self.assertChanged(target, etags[target])
+
+
+def make_image(image_format='PNG', size=(640, 320)):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, image_format)
+    return buffer.getvalue()
+
+
+class TemporaryMediaMixin:
+    def setUp(self):
+        super().setUp()
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.media_root = Path(directory.name)
+        override = override_settings(MEDIA_ROOT=directory.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+class ImageTests(TemporaryMediaMixin, TestCase):
+    def assertFails(self, converter, data, code):
+        with self.assertRaises(ValidationError) as context:
+            converter.to_internal_value(data)
+        self.assertEqual(context.exception.detail[0].code, code)
+
+    def test_decode(self):
+        content = make_image()
+        encoded = b64encode(content).decode()
+        wrapped = '\n'.join(encoded[start:start + 76]
+                            for start in range(0, len(encoded), 76))
+        for data in (f'data:image/png;base64,{encoded}', encoded, wrapped,
+                     f'data:image/png;base64,{wrapped}\r\n'):
+            with self.subTest(data=data[:30]):
+                file = Base64ImageConverter().to_internal_value(data)
+                self.assertTrue(file.name.endswith('.png'))
+                file.seek(0)
+                self.assertEqual(file.read(), content)
+
+    def test_decode_errors(self):
+        encoded = b64encode(make_image()).decode()
+        for converter, data, code in (
+            (Base64ImageConverter(), f'data:image/bmp;base64,{encoded}',
+             'invalid_type'),
+            (Base64ImageConverter(), b64encode(b'not an image').decode(),
+             'invalid_type'),
+            (Base64ImageConverter(), f'{encoded[:-4]}!!!!', 'invalid_base64'),
+            (Base64AvatarConverter(), 'A' * (AVATAR_MAX_SIZE // 3 * 4 + 8),
+             'too_large'),
+        ):
+            with self.subTest(code=code, data=data[:30]):
+                self.assertFails(converter, data, code)
+
+    def test_variants(self):
+        name = default_storage.save('recipes/image.png',
+                                    ContentFile(make_image()))
+        image = Recipe(image=name).image
+        self.assertEqual(get_image_url(image, CARD_IMAGE),
+                         default_storage.url(name))
+        targets = [(default_storage.path(get_variant_name(name, size)),
+                    dimensions)
+                   for size, dimensions in IMAGE_VARIANTS.items()]
+        self.assertEqual(write_variants(default_storage.path(name), targets),
+                         len(IMAGE_VARIANTS))
+        for path, (width, height) in targets:
+            with self.subTest(path=path), Image.open(path) as variant:
+                self.assertEqual(variant.format, 'WEBP')
+                self.assertLessEqual(variant.width, width)
+                self.assertLessEqual(variant.height, height)
+                self.assertEqual(variant.width, variant.height * 2)
+        self.assertEqual(get_image_url(image, CARD_IMAGE),
+                         default_storage.url(get_variant_name(name,
+                                                              CARD_IMAGE)))
+        self.assertEqual(get_image_url(image, ORIGINAL_IMAGE),
+                         default_storage.url(name))
+
+
+class ContentHashStorageTests(TemporaryMediaMixin, TestCase):
+    def get_files(self):
+        return sorted(path.name for path in self.media_root.rglob('*')
+                      if path.is_file())
+
+    def test_duplicates_are_stored_once(self):
+        content = make_image()
+        names = {default_storage.save(name, ContentFile(content))
+                 for name in ('recipes/first.png', 'recipes/second.PNG')}
+        self.assertEqual(len(names), 1)
+        name, = names
+        self.assertEqual(self.get_files(), [Path(name).name])
+
+    def test_concurrent_save_keeps_hash_name(self):
+        content = make_image()
+        name = default_storage.save('recipes/image.png', ContentFile(content))
+        self.assertEqual(default_storage.get_available_name(name), name)
+        self.assertEqual(default_storage._save(name, ContentFile(content)),
+                         name)
+        self.assertEqual(self.get_files(), [Path(name).name])
+
+    def test_file_is_deleted_with_last_reference(self):
+        name = default_storage.save('recipes/image.png',
+                                    ContentFile(make_image()))
+        variant = get_variant_name(name, CARD_IMAGE)
+        Path(default_storage.path(variant)).write_bytes(b'variant')
+        author = User.objects.create_user(
+            username='author', email='author@example.com', password='!'
+        )
+        recipes = [
+            Recipe.objects.create(author=author, name=f'Рецепт {number}',
+                                  text='Описание', cooking_time=5, image=name)
+            for number in range(2)
+        ]
+        self.assertEqual(StoredFile.objects.get(name=name).references, 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipes[0].delete()
+        self.assertEqual(StoredFile.objects.get(name=name).references, 1)
+        self.assertTrue(default_storage.exists(name))
+        with self.captureOnCommitCallbacks(execute=True):
+            recipes[1].delete()
+        self.assertFalse(StoredFile.objects.filter(name=name).exists())
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(default_storage.exists(variant))
+
+
+class LoadDataTests(TestCase):
+    files = {
+        'ingredients.csv': 'Соль,г\nбез единицы\n,г\nСахар,г\nСоль,г\n',
+        'ingredients.json': json.dumps([
+            {'name': 'Мука', 'measurement_unit': 'г'},
+            {'name': 'Вода'},
+            ['Масло', 'мл'],
+            {'name': None, 'measurement_unit': 'шт'},
+            {'name': 'Яйцо', 'measurement_unit': 'шт'},
+        ], ensure_ascii=False),
+        'ingredients.jsonl': '{"name": "Молоко", "measurement_unit": "мл"}'
+                             '\n\n{"measurement_unit": "мл"}\n',
+    }
+
+    def test_malformed_items_are_skipped(self):
+        with TemporaryDirectory() as directory:
+            paths = []
+            for name, content in self.files.items():
+                path = Path(directory, name)
+                path.write_text(content, encoding='utf-8')
+                paths.append(str(path))
+            output = StringIO()
+            with self.assertLogs('recipes.management.commands.load_csv_data',
+                                 'WARNING') as logs:
+                call_command('load_csv_data', *paths, stdout=output)
+        self.assertEqual(len(logs.records), 6)
+        self.assertIn('Обработано строк: 6, пропущено: 6, добавлено: 5',
+                      output.getvalue())
+        self.assertCountEqual(
+            Ingredient.objects.values_list('name', flat=True),
+            ['Соль', 'Сахар', 'Мука', 'Яйцо', 'Молоко']
+        )
+
+
+class PaginationTests(SeededDataMixin, TestCase):
+    def walk(self, url, params):
+        items = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            self.assertNotIn('count', data)
+            items.extend(data['results'])
+            if not data['next']:
+                return items
+            response = self.client.get(data['next'])
+
+    def test_recipe_cursor_pages(self):
+        expected = list(Recipe.objects.order_by('-pub_date', '-id')
+                        .values_list('pk', flat=True))
+        recipes = self.walk('/api/recipes/',
+                            {'pagination': 'cursor', 'limit': 7})
+        self.assertEqual([recipe['id'] for recipe in recipes], expected)
+        page = self.client.get('/api/recipes/', {'page': 2}).json()
+        self.assertEqual(page['count'], len(expected))
+        self.assertEqual([recipe['id'] for recipe in page['results']],
+                         expected[6:12])
+
+    def test_cursor_pages_skip_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/recipes/', {'pagination': 'cursor'})
+        self.assertFalse([sql for sql in get_statements(queries)
+                          if 'COUNT(' in sql.upper()])
+
+    def test_subscription_cursor_pages(self):
+        authors = self.walk('/api/users/subscriptions/',
+                            {'pagination': 'cursor', 'limit': 2})
+        self.assertEqual([author['username'] for author in authors],
+                         sorted(user.username for user in self.users[1:6]))
+
+
+class CatalogSnapshotTests(SeededDataMixin, TestCase):
+    decoders = {None: bytes, 'gzip': gzip.decompress, 'br': brotli.decompress}
+
+    def get(self, url, encoding=None, **headers):
+        if encoding:
+            headers['HTTP_ACCEPT_ENCODING'] = encoding
+        return self.anonymous_client.get(url, **headers)
+
+    def test_encodings(self):
+        for url, model in (('/api/ingredients/', Ingredient),
+                           ('/api/tags/', Tag)):
+            expected = list(model.objects.values_list('name', flat=True))
+            for encoding, decode in self.decoders.items():
+                with self.subTest(url=url, encoding=encoding):
+                    response = self.get(url, encoding)
+                    self.assertEqual(response.get('Content-Encoding'),
+                                     encoding)
+                    self.assertIn('Accept-Encoding', response['Vary'])
+                    items = json.loads(decode(response.content))
+                    self.assertEqual([item['name'] for item in items],
+                                     expected)
+                    self.assertEqual(
+                        self.get(url, encoding, HTTP_IF_NONE_MATCH=response[
+                            'ETag'
+                        ]).status_code,
+                        304
+                    )
+
+    def test_warm_snapshot_skips_database(self):
+        self.get('/api/ingredients/')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get('/api/ingredients/').status_code, 200)
+
+    def test_change_rebuilds_snapshot(self):
+        etag = self.get('/api/ingredients/')['ETag']
+        Ingredient.objects.create(name='Новый', measurement_unit='г')
+        response = self.get('/api/ingredients/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Новый', [item['name'] for item in response.json()])
+
+
+class SubscriptionsTests(SeededDataMixin, TestCase):
+    def get(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/users/subscriptions/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results'], len(get_statements(queries))
+
+    def test_limited_recipes(self):
+        authors, _ = self.get(recipes_limit=2, limit=10)
+        self.assertEqual(len(authors), 5)
+        for author in authors:
+            with self.subTest(author=author['username']):
+                expected = list(
+                    Recipe.objects.filter(author_id=author['id'])
+                    .order_by('-pub_date', '-id').values_list('pk', flat=True)
+                )
+                self.assertEqual(author['recipes_count'], len(expected))
+                self.assertEqual(
+                    [recipe['id'] for recipe in author['recipes']],
+                    expected[:2]
+                )
+                self.assertTrue(author['is_subscribed'])
+
+    def test_query_count_is_constant(self):
+        counts = {self.get(recipes_limit=recipes_limit, limit=limit)[1]
+                  for recipes_limit in (1, 3) for limit in (1, 5)}
+        self.assertEqual(len(counts), 1)
+
+
+class SubscribedFlagTests(SeededDataMixin, TestCase):
+    def get(self, url, limit):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'limit': limit})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results'], len(get_statements(queries))
+
+    def test_flags_and_query_count(self):
+        followed = {user.pk for user in self.users[1:6]}
+        for url, get_author in (
+            ('/api/recipes/', lambda item: item['author']),
+            ('/api/users/', lambda item: item),
+        ):
+            with self.subTest(url=url):
+                small, small_count = self.get(url, 2)
+                items, count = self.get(url, 10)
+                self.assertEqual(count, small_count)
+                authors = [get_author(item) for item in items]
+                self.assertGreater(len({author['id'] for author in authors}),
+                                   2)
+                for author in authors:
+                    self.assertEqual(author['is_subscribed'],
+                                     author['id'] in followed)
+
+
+class MultipartRecipeTests(TemporaryMediaMixin, SeededDataMixin, TestCase):
+    def get_data(self, **fields):
+        return {
+            'name': 'Рецепт с файлом',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'tags': [self.tags[0].pk],
+            'ingredients': [{'id': self.ingredients[0].pk, 'amount': 5}],
+            **fields,
+        }
+
+    def post(self, data, **files):
+        return self.client.post('/api/recipes/', {'data': data, **files},
+                                format='multipart')
+
+    def test_create_and_update(self):
+        content = make_image()
+        response = self.post(json.dumps(self.get_data()), image=(
+            SimpleUploadedFile('image.png', content, 'image/png')
+        ))
+        self.assertEqual(response.status_code, 201, response.content)
+        recipe = Recipe.objects.get(pk=response.json()['id'])
+        with recipe.image.open() as image:
+            self.assertEqual(image.read(), content)
+        rows = IngredientRecipe.objects.filter(recipe=recipe)
+        self.assertEqual(list(rows.values_list('ingredient_id', 'amount')),
+                         [(self.ingredients[0].pk, 5)])
+        response = self.client.patch(
+            f'/api/recipes/{recipe.pk}/',
+            {'data': json.dumps(self.get_data(name='Новое имя'))},
+            format='multipart'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.name, 'Новое имя')
+
+    def test_base64_still_works(self):
+        encoded = b64encode(make_image()).decode()
+        response = self.client.post('/api/recipes/', self.get_data(
+            image=f'data:image/png;base64,{encoded}'
+        ), format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def test_invalid_data_part(self):
+        for data in ('{', '[1, 2]'):
+            with self.subTest(data=data):
+                self.assertEqual(self.post(data).status_code, 400)
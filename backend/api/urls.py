@@ -2,7 +2,8 @@ from django.urls import include, path
 from django.views.generic import TemplateView
 from rest_framework.routers import DefaultRouter
 
-from .views import IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet
+from .views import (GetTokenView, IngredientViewSet, LogoutView, RecipeViewSet,
+                    TagViewSet, UserViewSet)
 
 app_name = 'api'
 
@@ -15,6 +16,8 @@ router.register('ingredients', IngredientViewSet, basename='ingredients')
 urlpatterns = [
     path('', include(router.urls)),
     path('', include('djoser.urls')),
+    path('auth/token/login/', GetTokenView.as_view(), name='login'),
+    path('auth/token/logout/', LogoutView.as_view(), name='logout'),
     path('auth/', include('djoser.urls.authtoken')),
     path(
         'docs/',
@@ -1,13 +1,77 @@
-import base64
+import binascii
+from base64 import b64decode
+from tempfile import SpooledTemporaryFile
+from uuid import uuid4
 
-from django.core.files.base import ContentFile
+from django.core.files import File
 from rest_framework.serializers import ImageField
 
+from recipes.constants import (AVATAR_MAX_SIZE, BASE64_CHUNK_SIZE,
+                               IMAGE_MAX_SIZE, IMAGE_SPOOL_MAX_SIZE)
+
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+ALLOWED_TYPES = ('jpeg', 'jpg', 'png', 'gif', 'webp')
+
+
+def get_image_extension(header):
+    for signature, extension in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return extension
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+class Base64ImageConverter(ImageField):
+    max_size = IMAGE_MAX_SIZE
+    default_error_messages = {
+        'invalid_base64': 'Некорректная строка base64.',
+        'invalid_type': 'Недопустимый формат изображения.',
+        'too_large': 'Размер изображения не должен превышать {max_size} байт.',
+    }
 
-class Base64AvatarConverter(ImageField):
     def to_internal_value(self, data):
-        if isinstance(data, str) and data.startswith("data:image"):
-            format, imgstr = data.split(";base64,")
-            ext = format.split("/")[-1]
-            data = ContentFile(base64.b64decode(imgstr), name=f"avatar.{ext}")
+        if not data:
+            return None
+        if isinstance(data, str):
+            data = self.decode(data)
+        elif getattr(data, 'size', 0) > self.max_size:
+            self.fail('too_large', max_size=self.max_size)
         return super().to_internal_value(data)
+
+    def decode(self, data):
+        header, separator, encoded = data.partition(';base64,')
+        if not separator:
+            encoded = header
+        elif header.split('/')[-1].lower() not in ALLOWED_TYPES:
+            self.fail('invalid_type')
+        encoded = ''.join(encoded.split())
+        if len(encoded) // 4 * 3 > self.max_size:
+            self.fail('too_large', max_size=self.max_size)
+        file = SpooledTemporaryFile(max_size=IMAGE_SPOOL_MAX_SIZE)
+        extension = None
+        try:
+            for start in range(0, len(encoded), BASE64_CHUNK_SIZE):
+                chunk = b64decode(encoded[start:start + BASE64_CHUNK_SIZE],
+                                  validate=True)
+                if extension is None:
+                    extension = get_image_extension(chunk)
+                    if extension is None:
+                        self.fail('invalid_type')
+                file.write(chunk)
+        except (binascii.Error, ValueError):
+            file.close()
+            self.fail('invalid_base64')
+        if extension is None:
+            self.fail('invalid_base64')
+        file.seek(0)
+        return File(file, name=f'{uuid4().hex}.{extension}')
+
+
+class Base64AvatarConverter(Base64ImageConverter):
+    max_size = AVATAR_MAX_SIZE
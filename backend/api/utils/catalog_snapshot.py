@@ -0,0 +1,74 @@
+import gzip
+from collections import namedtuple
+from hashlib import sha256
+
+import brotli
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.renderers import JSONRenderer
+
+from api.serializers import IngredientSerializer, TagSerializer
+from api.utils.versions import LocalCatalog
+from recipes.models import Ingredient, Tag
+
+Snapshot = namedtuple('Snapshot', ('version', 'etag', 'contents'))
+
+ENCODINGS = ('br', 'gzip')
+
+
+def get_accepted_encodings(request):
+    encodings = set()
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        encoding, _, params = item.partition(';')
+        quality = params.strip().removeprefix('q=')
+        try:
+            if params and not float(quality):
+                continue
+        except ValueError:
+            pass
+        encodings.add(encoding.strip().lower())
+    return encodings
+
+
+class CatalogSnapshot(LocalCatalog):
+    def __init__(self, model, serializer_class):
+        super().__init__(model)
+        self.serializer_class = serializer_class
+
+    def build(self, version):
+        content = JSONRenderer().render(
+            self.serializer_class(self.model.objects.all(), many=True).data
+        )
+        return Snapshot(version, sha256(content).hexdigest(), {
+            None: content,
+            'gzip': gzip.compress(content, mtime=0),
+            'br': brotli.compress(content),
+        })
+
+    def get_response(self, request):
+        snapshot = self.state
+        accepted = get_accepted_encodings(request)
+        encoding = next((encoding for encoding in ENCODINGS
+                         if encoding in accepted), None)
+        etag = quote_etag(
+            f'{snapshot.etag}-{encoding}' if encoding else snapshot.etag
+        )
+        last_modified = snapshot.version[1]
+        timestamp = last_modified and int(last_modified.timestamp())
+        response = get_conditional_response(request, etag=etag,
+                                            last_modified=timestamp)
+        if response is None:
+            response = HttpResponse(snapshot.contents[encoding],
+                                    content_type='application/json')
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        if timestamp:
+            response['Last-Modified'] = http_date(timestamp)
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+ingredient_snapshot = CatalogSnapshot(Ingredient, IngredientSerializer)
+tag_snapshot = CatalogSnapshot(Tag, TagSerializer)
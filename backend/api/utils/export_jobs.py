@@ -0,0 +1,123 @@
+import hashlib
+from datetime import timedelta
+from functools import partial
+
+from django.core.files.storage import storages
+from django.db import connection
+from django.utils import timezone
+
+from api.utils.generate_shopping_list import generate_shopping_list, write_pdf
+from api.utils.worker_pool import worker_pool
+from recipes.constants import (EXPORT_PURGE_DAYS, EXPORT_STALE_AFTER,
+                               EXPORT_STORAGE)
+from recipes.models import ShoppingListExport
+from recipes.shopping_lists import user_shopping_list
+
+Status = ShoppingListExport.Status
+
+
+def get_export_storage():
+    return storages[EXPORT_STORAGE]
+
+
+def get_shopping_list_lines(user):
+    return list(generate_shopping_list(user_shopping_list(user).iterator()))
+
+
+def get_cart_hash(lines):
+    return hashlib.sha256('\n'.join(lines).encode()).hexdigest()
+
+
+def get_export_name(cart_hash):
+    return f'{cart_hash}.pdf'
+
+
+def is_rendered(cart_hash):
+    return get_export_storage().exists(get_export_name(cart_hash))
+
+
+def render_export(lines, cart_hash):
+    storage = get_export_storage()
+    name = get_export_name(cart_hash)
+    if not storage.exists(name):
+        write_pdf(lines, storage.path(name))
+    return name
+
+
+def open_export(name):
+    return get_export_storage().open(name)
+
+
+def finish_export(job_id, future):
+    error = future.exception()
+    try:
+        ShoppingListExport.objects.filter(pk=job_id).update(
+            status=Status.FAILED if error else Status.DONE,
+            error=repr(error) if error else '',
+            updated_at=timezone.now()
+        )
+    finally:
+        connection.close()
+
+
+def enqueue_export(user, lines):
+    cart_hash = get_cart_hash(lines)
+    job = ShoppingListExport.objects.filter(
+        user=user, cart_hash=cart_hash
+    ).exclude(status=Status.FAILED).first()
+    if job is not None and job.status != Status.DONE:
+        return job
+    if is_rendered(cart_hash):
+        return job or ShoppingListExport.objects.create(
+            user=user, cart_hash=cart_hash, status=Status.DONE
+        )
+    if job is None:
+        job = ShoppingListExport.objects.create(user=user,
+                                                cart_hash=cart_hash)
+    else:
+        job.status = Status.PENDING
+        job.save(update_fields=('status', 'updated_at'))
+    worker_pool.submit(
+        write_pdf, lines, get_export_storage().path(job.file_name)
+    ).add_done_callback(partial(finish_export, job.pk))
+    return job
+
+
+def get_stale_exports(stale_after=EXPORT_STALE_AFTER):
+    return ShoppingListExport.objects.filter(
+        status=Status.PENDING,
+        updated_at__lt=timezone.now() - timedelta(seconds=stale_after)
+    ).select_related('user')
+
+
+def recover_export(job):
+    lines = get_shopping_list_lines(job.user)
+    job.cart_hash = get_cart_hash(lines)
+    try:
+        render_export(lines, job.cart_hash)
+    except Exception as error:
+        job.status, job.error = Status.FAILED, repr(error)
+    else:
+        job.status, job.error = Status.DONE, ''
+    job.save(update_fields=('cart_hash', 'status', 'error', 'updated_at'))
+    return job
+
+
+def purge_exports(days=EXPORT_PURGE_DAYS):
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = ShoppingListExport.objects.filter(
+        updated_at__lt=cutoff
+    ).delete()
+    used = {
+        job.file_name
+        for job in ShoppingListExport.objects.only('cart_hash')
+    }
+    storage = get_export_storage()
+    removed = 0
+    if storage.exists(''):
+        for name in storage.listdir('')[1]:
+            if (name.endswith('.pdf') and name not in used
+                    and storage.get_modified_time(name) < cutoff):
+                storage.delete(name)
+                removed += 1
+    return deleted, removed
@@ -1,42 +1,111 @@
-from io import BytesIO
+import csv
+import json
+import os
+import shutil
+from functools import lru_cache
+from itertools import chain
 from pathlib import Path
+from tempfile import NamedTemporaryFile, SpooledTemporaryFile
 
 from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import simpleSplit
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfgen import canvas
 
+from recipes.constants import (PDF_FONT_NAME, PDF_FONT_SIZE, PDF_LINE_HEIGHT,
+                               PDF_MARGIN, PDF_SPOOL_MAX_SIZE)
+
+FONT_PATH = Path(__file__).resolve().parents[2] / 'data' / 'Anticva.ttf'
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def format_ingredient(ingredient):
+    return (f"{ingredient['ingredient__name']} - {ingredient['amount']} "
+            f"{ingredient['ingredient__measurement_unit']}")
+
 
 def generate_shopping_list(ingredients):
-    if not ingredients:
-        return "Список покупок пуст.\n"
+    ingredients = iter(ingredients)
+    first = next(ingredients, None)
+    if first is None:
+        yield 'Список покупок пуст.'
+        return
+    yield 'Список покупок'
+    yield ''
+    for ingredient in chain((first,), ingredients):
+        yield format_ingredient(ingredient)
+
+
+def generate_txt(ingredients):
+    for line in generate_shopping_list(ingredients):
+        yield f'{line}\n'
+
 
-    shopping_list = 'Список покупок\n\n'
+def generate_csv(ingredients):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'amount', 'measurement_unit'))
     for ingredient in ingredients:
-        shopping_list += (
-            f"{ingredient['ingredient__name']} - {ingredient['amount']} "
-            f"{ingredient['ingredient__measurement_unit']}\n"
-        )
-    return shopping_list
-
-
-def generate_pdf(shopping_list):
-    buffer = BytesIO()
-    font_path = Path(__file__).resolve().parents[2] / 'data' / 'Anticva.ttf'
-    pdfmetrics.registerFont(TTFont('Anticva', str(font_path)))
-    pdf = canvas.Canvas(buffer, pagesize=A4)
-    pdf.setFont('Anticva', 16)
-    width, height = A4
+        yield writer.writerow((ingredient['ingredient__name'],
+                               ingredient['amount'],
+                               ingredient['ingredient__measurement_unit']))
+
+
+def generate_json(ingredients):
+    separator = '['
+    for ingredient in ingredients:
+        yield separator + json.dumps({
+            'name': ingredient['ingredient__name'],
+            'amount': ingredient['amount'],
+            'measurement_unit': ingredient['ingredient__measurement_unit'],
+        }, ensure_ascii=False)
+        separator = ','
+    yield '[]' if separator == '[' else ']'
+
 
-    y = height - 40
-    x = 40
+@lru_cache(maxsize=None)
+def register_font():
+    pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, str(FONT_PATH)))
+    return PDF_FONT_NAME
 
-    for line in shopping_list.splitlines():
-        pdf.drawString(x, y, line)
-        y -= 15
+
+def generate_pdf(lines):
+    font = register_font()
+    buffer = SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_SIZE)
+    pdf = canvas.Canvas(buffer, pagesize=A4, pageCompression=1)
+    width, height = A4
+    pdf.setFont(font, PDF_FONT_SIZE)
+    y = height - PDF_MARGIN
+    for line in lines:
+        for part in simpleSplit(line, font, PDF_FONT_SIZE,
+                                width - 2 * PDF_MARGIN) or ['']:
+            if y < PDF_MARGIN:
+                pdf.showPage()
+                pdf.setFont(font, PDF_FONT_SIZE)
+                y = height - PDF_MARGIN
+            pdf.drawString(PDF_MARGIN, y, part)
+            y -= PDF_LINE_HEIGHT
 
     pdf.showPage()
     pdf.save()
 
     buffer.seek(0)
     return buffer
+
+
+def write_pdf(lines, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with NamedTemporaryFile(dir=path.parent, suffix='.tmp',
+                            delete=False) as file:
+        try:
+            shutil.copyfileobj(generate_pdf(lines), file)
+        except BaseException:
+            os.unlink(file.name)
+            raise
+    os.replace(file.name, path)
+    return str(path)
@@ -0,0 +1,52 @@
+import os
+
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from api.utils.worker_pool import worker_pool
+from recipes.constants import (IMAGE_VARIANT_FORMAT, IMAGE_VARIANT_QUALITY,
+                               IMAGE_VARIANTS)
+from recipes.storage import get_variant_name
+
+
+def get_image_url(image, size):
+    if not image:
+        return None
+    if size in IMAGE_VARIANTS:
+        name = get_variant_name(image.name, size)
+        if default_storage.exists(name):
+            return default_storage.url(name)
+    return image.url
+
+
+def write_variants(source, targets):
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA')
+        for path, dimensions in targets:
+            variant = image.copy()
+            variant.thumbnail(dimensions)
+            temp_path = f'{path}.tmp'
+            variant.save(temp_path, IMAGE_VARIANT_FORMAT,
+                         quality=IMAGE_VARIANT_QUALITY)
+            os.replace(temp_path, path)
+    return len(targets)
+
+
+def generate_variants(name, sizes, callback=None):
+    if not default_storage.exists(name):
+        return None
+    targets = [
+        (default_storage.path(variant), IMAGE_VARIANTS[size])
+        for size, variant in ((size, get_variant_name(name, size))
+                              for size in sizes)
+        if not default_storage.exists(variant)
+    ]
+    if not targets:
+        return None
+    future = worker_pool.submit(write_variants,
+                                default_storage.path(name), targets)
+    if callback is not None:
+        future.add_done_callback(callback)
+    return future
@@ -0,0 +1,37 @@
+from bisect import bisect_left
+from collections import namedtuple
+
+from api.utils.versions import LocalCatalog
+from recipes.models import Ingredient
+
+IndexState = namedtuple('IndexState', ('version', 'keys', 'rows'))
+
+
+def fold(value):
+    return value.strip().casefold()
+
+
+class IngredientIndex(LocalCatalog):
+    def build(self, version):
+        ingredients = self.model.objects.values_list('id', 'name',
+                                                     'measurement_unit')
+        rows = sorted(
+            ({'id': pk, 'name': name, 'measurement_unit': unit}
+             for pk, name, unit in ingredients),
+            key=lambda row: (fold(row['name']), row['id'])
+        )
+        return IndexState(version, [fold(row['name']) for row in rows], rows)
+
+    def search(self, prefix, limit=None):
+        state = self.state
+        prefix = fold(prefix)
+        start = bisect_left(state.keys, prefix)
+        end = bisect_left(state.keys, prefix + chr(0x10FFFF), lo=start)
+        matches = sorted(
+            range(start, end),
+            key=lambda i: (state.keys[i] != prefix, len(state.keys[i]), i)
+        )
+        return [state.rows[i] for i in matches[:limit]]
+
+
+ingredient_index = IngredientIndex(Ingredient)
@@ -0,0 +1,90 @@
+from collections import Counter
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import caches
+
+from recipes.constants import (RECIPE_CACHE_KEY, RECIPE_CACHE_STATS_KEY,
+                               RECIPE_CACHE_VERSION)
+
+PER_USER_FIELDS = ('is_favorited', 'is_in_shopping_cart')
+PER_USER_AUTHOR_FIELDS = ('is_subscribed',)
+PROCESS_LOCAL_BACKENDS = ('LocMemCache', 'DummyCache')
+
+pending_stats = Counter()
+pending_stats_lock = Lock()
+
+
+def get_cache():
+    return caches[settings.RECIPE_CACHE_ALIAS]
+
+
+def make_key(recipe, image_size):
+    return RECIPE_CACHE_KEY.format(version=RECIPE_CACHE_VERSION,
+                                   id=recipe.pk,
+                                   stamp=recipe.updated_at.timestamp(),
+                                   image_size=image_size)
+
+
+def get_many(recipes, image_size):
+    keys = {make_key(recipe, image_size): recipe.pk for recipe in recipes}
+    found = get_cache().get_many(keys)
+    record_stats(hits=len(found), misses=len(keys) - len(found))
+    return {keys[key]: data for key, data in found.items()}
+
+
+def set_many(representations, image_size):
+    get_cache().set_many(
+        {make_key(recipe, image_size): strip_per_user_fields(data)
+         for recipe, data in representations.items()},
+        timeout=settings.RECIPE_CACHE_TIMEOUT
+    )
+
+
+def strip_per_user_fields(data):
+    data = {key: (None if key in PER_USER_FIELDS else value)
+            for key, value in data.items()}
+    if isinstance(data.get('author'), dict):
+        data['author'] = {
+            key: (None if key in PER_USER_AUTHOR_FIELDS else value)
+            for key, value in data['author'].items()
+        }
+    return data
+
+
+def is_shared_cache():
+    return type(get_cache()).__name__ not in PROCESS_LOCAL_BACKENDS
+
+
+def record_stats(**counters):
+    with pending_stats_lock:
+        pending_stats.update(counters)
+        if pending_stats.total() < settings.RECIPE_CACHE_STATS_BATCH:
+            return
+        counters = dict(pending_stats)
+        pending_stats.clear()
+    flush_stats(counters)
+
+
+def flush_stats(counters):
+    cache = get_cache()
+    for name, delta in counters.items():
+        if not delta:
+            continue
+        key = RECIPE_CACHE_STATS_KEY.format(name)
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            if not cache.add(key, delta, timeout=None):
+                cache.incr(key, delta)
+
+
+def get_stats():
+    cache = get_cache()
+    return {name: cache.get(RECIPE_CACHE_STATS_KEY.format(name), 0)
+            for name in ('hits', 'misses')}
+
+
+def reset_stats():
+    get_cache().delete_many([RECIPE_CACHE_STATS_KEY.format(name)
+                             for name in ('hits', 'misses')])
@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.utils.crypto import salted_hmac
+
+from recipes.constants import (SHORT_LINK_ALPHABET, SHORT_LINK_CHECK_BITS,
+                               SHORT_LINK_HALF_BITS, SHORT_LINK_LENGTH,
+                               SHORT_LINK_ROUNDS, SHORT_LINK_SALT)
+
+HALF_MASK = (1 << SHORT_LINK_HALF_BITS) - 1
+BLOCK_MASK = (1 << 2 * SHORT_LINK_HALF_BITS) - 1
+CHECK_MASK = (1 << SHORT_LINK_CHECK_BITS) - 1
+MAX_RECIPE_ID = BLOCK_MASK >> SHORT_LINK_CHECK_BITS
+BASE = len(SHORT_LINK_ALPHABET)
+
+
+def round_key(number, value):
+    digest = salted_hmac(SHORT_LINK_SALT, f'{number}:{value}',
+                         secret=settings.SHORT_LINK_KEY).digest()
+    return int.from_bytes(digest[:4], 'big') & HALF_MASK
+
+
+def encrypt(value):
+    left, right = value >> SHORT_LINK_HALF_BITS, value & HALF_MASK
+    for number in range(SHORT_LINK_ROUNDS):
+        left, right = right, left ^ round_key(number, right)
+    return (left << SHORT_LINK_HALF_BITS) | right
+
+
+def decrypt(value):
+    left, right = value >> SHORT_LINK_HALF_BITS, value & HALF_MASK
+    for number in reversed(range(SHORT_LINK_ROUNDS)):
+        left, right = right ^ round_key(number, left), left
+    return (left << SHORT_LINK_HALF_BITS) | right
+
+
+def encode_short_link(recipe_id):
+    if not 0 < recipe_id <= MAX_RECIPE_ID:
+        raise ValueError(f'Нельзя сократить ссылку на рецепт {recipe_id}.')
+    value = encrypt(recipe_id << SHORT_LINK_CHECK_BITS)
+    chars = []
+    for _ in range(SHORT_LINK_LENGTH):
+        value, index = divmod(value, BASE)
+        chars.append(SHORT_LINK_ALPHABET[index])
+    return ''.join(reversed(chars))
+
+
+def decode_short_link(link):
+    if len(link) != SHORT_LINK_LENGTH:
+        return None
+    value = 0
+    for char in link:
+        index = SHORT_LINK_ALPHABET.find(char)
+        if index < 0:
+            return None
+        value = value * BASE + index
+    if value > BLOCK_MASK:
+        return None
+    value = decrypt(value)
+    if value & CHECK_MASK:
+        return None
+    return value >> SHORT_LINK_CHECK_BITS or None
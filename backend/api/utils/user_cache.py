@@ -0,0 +1,48 @@
+from collections import OrderedDict
+from copy import copy
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+
+from users.models import User
+
+
+class UserCache:
+    def __init__(self):
+        self._lock = Lock()
+        self._users = OrderedDict()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None:
+                user, expires_at = entry
+                if expires_at > monotonic():
+                    self._users.move_to_end(user_id)
+                    return copy(user)
+                del self._users[user_id]
+        user = User.objects.filter(pk=user_id).first()
+        if user is not None:
+            self.set(user)
+        return user
+
+    def set(self, user):
+        with self._lock:
+            self._users[user.pk] = (
+                copy(user), monotonic() + settings.AUTH_USER_CACHE_TTL
+            )
+            self._users.move_to_end(user.pk)
+            while len(self._users) > settings.AUTH_USER_CACHE_SIZE:
+                self._users.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+
+user_cache = UserCache()
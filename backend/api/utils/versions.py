@@ -0,0 +1,49 @@
+from hashlib import md5
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+
+def get_table_version(queryset):
+    version = queryset.aggregate(count=Count('pk'),
+                                 last_modified=Max('updated_at'))
+    return version['count'], version['last_modified']
+
+
+def make_etag(*parts):
+    return md5(':'.join(map(str, parts)).encode()).hexdigest()
+
+
+class LocalCatalog:
+    def __init__(self, model):
+        self.model = model
+        self._lock = Lock()
+        self._state = None
+        self._checked_at = None
+
+    def build(self, version):
+        raise NotImplementedError
+
+    def invalidate(self):
+        self._state = None
+
+    @property
+    def state(self):
+        state = self._state
+        if state is not None and (
+            monotonic() - self._checked_at
+            < settings.LOCAL_CATALOG_CHECK_INTERVAL
+        ):
+            return state
+        with self._lock:
+            version = get_table_version(self.model.objects.all())
+            if self._state is None or self._state.version != version:
+                self._state = self.build(version)
+            self._checked_at = monotonic()
+            return self._state
+
+    @property
+    def version(self):
+        return self.state.version
@@ -0,0 +1,27 @@
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from multiprocessing import get_context
+from threading import Lock
+
+from django.conf import settings
+
+
+class WorkerPool:
+    def __init__(self):
+        self.lock = Lock()
+        self.executor = None
+
+    def submit(self, *args):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(
+                    max_workers=settings.WORKER_POOL_SIZE,
+                    mp_context=get_context('spawn')
+                )
+            try:
+                return self.executor.submit(*args)
+            except BrokenExecutor:
+                self.executor = None
+        return self.submit(*args)
+
+
+worker_pool = WorkerPool()
@@ -1,36 +1,80 @@
+from django.conf import settings
 from django.contrib.auth import authenticate
-from django.db.models import Count, Sum
-from django.http.response import FileResponse
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import (BooleanField, Exists, F, OuterRef, Prefetch,
+                              Value, Window)
+from django.db.models.functions import RowNumber
+from django.http.response import FileResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.functional import SimpleLazyObject
+from django.utils.http import content_disposition_header, http_date, quote_etag
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.serializers import SetPasswordSerializer
+from djoser.views import TokenDestroyView
 from rest_framework import status
 from rest_framework.decorators import action, api_view
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.generics import GenericAPIView
 from rest_framework.mixins import (CreateModelMixin, ListModelMixin,
                                    RetrieveModelMixin)
+from rest_framework.parsers import FormParser, JSONParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.viewsets import (ModelViewSet, ReadOnlyModelViewSet,
                                      ViewSetMixin)
-from rest_framework_simplejwt.tokens import AccessToken
 
+from api.authentication import get_access_token
 from api.filters import IngredientFilter, RecipeFilter
-from api.paginators import UserPagination
+from api.paginators import (FeedCursorPagination, RecipePagination,
+                            SubscriptionPagination, UserPagination)
+from api.parsers import MultiPartJSONParser
 from api.permissions import AuthorPermission
+from api.renderers import (CSVRenderer, PDFRenderer, PlainTextRenderer,
+                           ShoppingListJSONRenderer)
 from api.serializers import (FavoriteSerializer, IngredientSerializer,
-                             RecipeCreateSerializer, RecipeInfoSerializer,
-                             ShoppingCartSerializer, SubscribeActionSerializer,
-                             SubscribeSerializer, TagSerializer,
-                             TokenCreateSerializer, UserAvatarSetSerializer,
-                             UserCreateSerializer, UserSerializer)
-from api.utils.create_short_link import create_short_link
-from api.utils.generate_shopping_list import (generate_pdf,
-                                              generate_shopping_list)
+                             RecipeBatchSerializer, RecipeCreateSerializer,
+                             RecipeInfoSerializer, ShoppingCartSerializer,
+                             ShoppingListExportSerializer,
+                             SubscribeActionSerializer, SubscribeSerializer,
+                             TagSerializer, TokenCreateSerializer,
+                             UserAvatarSetSerializer, UserCreateSerializer,
+                             UserSerializer)
+from api.utils.catalog_snapshot import ingredient_snapshot, tag_snapshot
+from api.utils.export_jobs import (enqueue_export, get_cart_hash,
+                                   get_shopping_list_lines, open_export,
+                                   render_export)
+from api.utils.generate_shopping_list import (generate_csv, generate_json,
+                                              generate_txt)
+from api.utils.ingredient_index import ingredient_index
+from api.utils.short_links import decode_short_link, encode_short_link
+from api.utils.user_cache import user_cache
+from api.utils.versions import get_table_version, make_etag
+from recipes.constants import (ASYNC_EXPORT_MODE, BATCH_ADDED,
+                               BATCH_ALREADY_ADDED, BATCH_NOT_ADDED,
+                               BATCH_NOT_FOUND, BATCH_REMOVED, CARD_IMAGE,
+                               DETAIL_IMAGE, EXPORT_MODE_QUERY_PARAM,
+                               FEED_READ_STRATEGY, FEED_STRATEGY_QUERY_PARAM,
+                               FEED_WRITE_STRATEGY, FIELDS_QUERY_PARAM,
+                               IMAGE_SIZE_QUERY_PARAM, IMAGE_VARIANTS,
+                               OMIT_QUERY_PARAM, ORIGINAL_IMAGE,
+                               PAGE_SIZE_QUERY_PARAM,
+                               RECIPES_LIMIT_QUERY_PARAM)
+from recipes.counters import delete_counted
 from recipes.models import (Favorite, Ingredient, IngredientRecipe, Recipe,
-                            ShoppingCart, ShortLink, Tag)
+                            ShoppingCart, ShoppingListExport, ShortLink, Tag)
+from recipes.shopping_lists import user_shopping_list
+from recipes.user_recipes import (add_user_recipes, remove_user_recipe,
+                                  remove_user_recipes)
 from users.models import Follow, User
 
+SHOPPING_LIST_EXPORTERS = {
+    PlainTextRenderer.format: generate_txt,
+    CSVRenderer.format: generate_csv,
+    ShoppingListJSONRenderer.format: generate_json,
+}
+
 
 class AddRemoveMixin:
     def add_remove(self, request, pk, model,
@@ -39,23 +83,177 @@ class AddRemoveMixin:
                    error_message):
         instance = get_object_or_404(Recipe, id=pk)
         if request.method == 'DELETE':
-            try:
-                obj = model.objects.get(user=request.user, recipe_id=pk)
-            except model.DoesNotExist:
+            if not remove_user_recipe(model, request.user, instance.pk):
                 return Response({"detail": error_message},
                                 status=status.HTTP_400_BAD_REQUEST
                                 )
-            obj.delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
-        data = {'user': request.user.id, 'recipe': instance.id}
-        serializer = serializer_class(data=data)
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
+        serializer = serializer_class(context=self.get_serializer_context())
+        serializer.instance = serializer.create(
+            {'user': request.user, 'recipe': instance}
+        )
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    def add_remove_many(self, request, model):
+        serializer = RecipeBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipes']
+        found = set(Recipe.objects.filter(pk__in=recipe_ids)
+                    .values_list('pk', flat=True))
+        if request.method == 'DELETE':
+            changed = remove_user_recipes(model, request.user, found)
+            done, skipped = BATCH_REMOVED, BATCH_NOT_ADDED
+        else:
+            changed = add_user_recipes(
+                model, request.user,
+                [recipe_id for recipe_id in recipe_ids if recipe_id in found]
+            )
+            done, skipped = BATCH_ADDED, BATCH_ALREADY_ADDED
+        changed = set(changed)
+        return Response({'results': [
+            {
+                'id': recipe_id,
+                'status': (BATCH_NOT_FOUND if recipe_id not in found
+                           else done if recipe_id in changed else skipped)
+            } for recipe_id in recipe_ids
+        ]})
+
+
+class SubscriptionsContextMixin:
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        user = self.request.user
+        if user.is_authenticated:
+            context['subscriptions'] = SimpleLazyObject(
+                lambda: set(user.follower.values_list('author_id',
+                                                      flat=True))
+            )
+        return context
+
+
+class ImageSizeContextMixin:
+    default_image_sizes = {'retrieve': DETAIL_IMAGE}
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        image_size = self.request.query_params.get(IMAGE_SIZE_QUERY_PARAM)
+        if image_size not in IMAGE_VARIANTS and image_size != ORIGINAL_IMAGE:
+            image_size = self.default_image_sizes.get(self.action, CARD_IMAGE)
+        context['image_size'] = image_size
+        return context
+
+
+class ConditionalGetMixin:
+    vary_headers = ()
+
+    def get_validators(self, request, *args, **kwargs):
+        return None, None
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        try:
+            etag, last_modified = self.get_validators(request, *args,
+                                                      **kwargs)
+        except (TypeError, ValueError, DjangoValidationError):
+            etag = last_modified = None
+        if etag is None and last_modified is None:
+            return handler(request, *args, **kwargs)
+        etag = etag and quote_etag(etag)
+        timestamp = last_modified and int(last_modified.timestamp())
+        response = get_conditional_response(request, etag=etag,
+                                            last_modified=timestamp)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK,
+                                    status.HTTP_304_NOT_MODIFIED):
+            if etag:
+                response['ETag'] = etag
+            if timestamp:
+                response['Last-Modified'] = http_date(timestamp)
+            if self.vary_headers:
+                patch_vary_headers(response, self.vary_headers)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request,
+                                         *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request,
+                                         *args, **kwargs)
+
+
+class CatalogConditionalGetMixin(ConditionalGetMixin):
+    snapshot = None
+
+    def get_table_version(self, queryset):
+        return get_table_version(queryset)
+
+    def list(self, request, *args, **kwargs):
+        if (self.snapshot is not None and not request.query_params
+                and request.accepted_renderer.format == 'json'):
+            return self.snapshot.get_response(request)
+        return super().list(request, *args, **kwargs)
+
+    def get_validators(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        if self.action == 'retrieve':
+            last_modified = queryset.filter(pk=kwargs['pk']).values_list(
+                'updated_at', flat=True
+            ).first()
+            if last_modified is None:
+                return None, None
+            return (make_etag(queryset.model._meta.label, kwargs['pk'],
+                              last_modified.timestamp()),
+                    last_modified)
+        count, last_modified = self.get_table_version(queryset)
+        return (make_etag(queryset.model._meta.label, count,
+                          last_modified and last_modified.timestamp(),
+                          request.get_full_path()),
+                last_modified)
+
+
+class SparseFieldsMixin:
+    def get_sparse_fields(self):
+        if self.request.method != 'GET':
+            return None, None
+        return tuple(
+            [name.strip() for name in value.split(',') if name.strip()]
+            if value else None
+            for value in (
+                self.request.query_params.get(FIELDS_QUERY_PARAM),
+                self.request.query_params.get(OMIT_QUERY_PARAM),
+            )
+        )
+
+    def get_requested_fields(self, serializer_class):
+        names = set(serializer_class.Meta.fields)
+        fields, omit = self.get_sparse_fields()
+        if fields:
+            names &= set(fields)
+        if omit:
+            names -= set(omit)
+        return names
+
+    def get_requested_model_fields(self, serializer_class):
+        model = serializer_class.Meta.model
+        return {'pk'} | {
+            field.name for field in model._meta.concrete_fields
+            if field.name in self.get_requested_fields(serializer_class)
+        }
+
+    def get_serializer(self, *args, **kwargs):
+        fields, omit = self.get_sparse_fields()
+        if fields:
+            kwargs.setdefault('fields', fields)
+        if omit:
+            kwargs.setdefault('omit', omit)
+        return super().get_serializer(*args, **kwargs)
+
 
 class GetTokenView(GenericAPIView):
     serializer_class = TokenCreateSerializer
+    permission_classes = (AllowAny,)
+    authentication_classes = ()
 
     def post(self, request):
         serializer = self.get_serializer(data=request.data)
@@ -63,37 +261,73 @@ class GetTokenView(GenericAPIView):
         user = authenticate(email=serializer.validated_data['email'],
                             password=serializer.validated_data['password'])
         if user:
-            access = AccessToken.for_user(user)
-            return Response({'auth_token': str(access)},
+            return Response({'auth_token': str(get_access_token(user))},
                             status=status.HTTP_200_OK)
         return Response({'message': 'Wrong credentials'},
                         status=status.HTTP_400_BAD_REQUEST)
 
 
-class TagViewSet(ReadOnlyModelViewSet):
+class LogoutView(TokenDestroyView):
+    def post(self, request):
+        User.objects.filter(pk=request.user.pk).update(
+            token_version=F('token_version') + 1
+        )
+        user_cache.invalidate(request.user.pk)
+        return super().post(request)
+
+
+class TagViewSet(CatalogConditionalGetMixin, ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
+    snapshot = tag_snapshot
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(CatalogConditionalGetMixin, ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filter_backends = (IngredientFilter,)
     search_fields = ('^name',)
     pagination_class = None
-
-
-class UserViewSet(CreateModelMixin,
+    snapshot = ingredient_snapshot
+
+    def get_table_version(self, queryset):
+        if settings.INGREDIENT_PREFIX_INDEX:
+            return ingredient_index.version
+        return super().get_table_version(queryset)
+
+    def list(self, request, *args, **kwargs):
+        if not (settings.INGREDIENT_PREFIX_INDEX
+                and request.query_params.get(
+                    IngredientFilter.search_param, ''
+                ).strip()):
+            return super().list(request, *args, **kwargs)
+        return self.conditional_response(self.search, request,
+                                         *args, **kwargs)
+
+    def search(self, request, *args, **kwargs):
+        limit = request.query_params.get(PAGE_SIZE_QUERY_PARAM)
+        return Response(ingredient_index.search(
+            request.query_params[IngredientFilter.search_param],
+            int(limit) if limit and limit.isdigit() else None
+        ))
+
+
+class UserViewSet(SubscriptionsContextMixin,
+                  SparseFieldsMixin,
+                  CreateModelMixin,
                   ListModelMixin,
                   RetrieveModelMixin,
                   ViewSetMixin,
                   GenericAPIView):
-    queryset = User.objects.all().annotate(
-        recipes_count=Count('recipes')
-    )
+    queryset = User.objects.all()
     pagination_class = UserPagination
 
+    def get_queryset(self):
+        return super().get_queryset().only(
+            *self.get_requested_model_fields(UserSerializer)
+        )
+
     def get_permissions(self):
         if self.action in ['create', 'retrieve', 'list']:
             self.permission_classes = (AllowAny,)
@@ -114,13 +348,14 @@ class UserViewSet(CreateModelMixin,
 
     @action(detail=False, url_path='me/avatar', methods=['put', 'delete'])
     def avatar(self, request, *args, **kwargs):
-        user = request.user
+        user = get_object_or_404(User, pk=request.user.pk)
         if request.method == 'PUT':
             serializer = UserAvatarSetSerializer(user, data=request.data)
             serializer.is_valid(raise_exception=True)
             serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
-        user.avatar.delete()
+        user.avatar = None
+        user.save(update_fields=('avatar',))
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=False, url_path='me', methods=['get'])
@@ -135,12 +370,12 @@ class UserViewSet(CreateModelMixin,
 
     @action(detail=False, methods=['post'])
     def set_password(self, request, *args, **kwargs):
-        user = request.user
+        request.user = user = get_object_or_404(User, pk=request.user.pk)
         serializer = SetPasswordSerializer(data=request.data,
                                            context={'request': request})
         serializer.is_valid(raise_exception=True)
         user.set_password(serializer.validated_data['new_password'])
-        user.save()
+        user.save(update_fields=('password',))
         return Response({'message': 'password changed'},
                         status=status.HTTP_204_NO_CONTENT)
 
@@ -149,44 +384,125 @@ class UserViewSet(CreateModelMixin,
     def subscribe(self, request, pk=None):
         author = get_object_or_404(User, pk=pk)
         if request.method == 'POST':
-            data = {'user': request.user.id, 'author': author.id}
             serializer = SubscribeActionSerializer(
-                data=data,
-                context={'request': request}
+                context=self.get_serializer_context()
+            )
+            serializer.instance = serializer.create(
+                {'user': request.user, 'author': author}
             )
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
-        subscription = Follow.objects.filter(user=request.user,
-                                             author=author).first()
-        if not subscription:
+        if not delete_counted(
+            Follow.objects.filter(user=request.user, author=author),
+            (request.user.pk,)
+        ):
             return Response({"detail": "Subscription does not exist."},
                             status=status.HTTP_400_BAD_REQUEST)
-        subscription.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=False, methods=['get'],
-            permission_classes=[IsAuthenticated])
+            permission_classes=[IsAuthenticated],
+            pagination_class=SubscriptionPagination)
     def subscriptions(self, request):
-        queryset = User.objects.filter(following__user=request.user)
+        limit = request.query_params.get(RECIPES_LIMIT_QUERY_PARAM, '')
+        recipes = Recipe.objects.only('name', 'image', 'cooking_time',
+                                      'author')
+        if limit.isdigit():
+            recipes = recipes.annotate(row_number=Window(
+                RowNumber(),
+                partition_by=F('author'),
+                order_by=(F('pub_date').desc(), F('id').desc())
+            )).filter(row_number__lte=int(limit))
+        queryset = User.objects.filter(following__user=request.user).annotate(
+            is_subscribed=Value(True, output_field=BooleanField())
+        ).prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='limited_recipes')
+        )
         page = self.paginate_queryset(queryset)
         if page is not None:
-            serializer = SubscribeSerializer(page, many=True,
-                                             context={'request': request})
+            serializer = SubscribeSerializer(
+                page, many=True, context=self.get_serializer_context()
+            )
             return self.get_paginated_response(serializer.data)
 
-        serializer = SubscribeSerializer(queryset, many=True,
-                                         context={'request': request})
+        serializer = SubscribeSerializer(
+            queryset, many=True, context=self.get_serializer_context()
+        )
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class RecipeViewSet(ModelViewSet, AddRemoveMixin):
+class RecipeViewSet(ConditionalGetMixin, SubscriptionsContextMixin,
+                    ImageSizeContextMixin, SparseFieldsMixin, ModelViewSet,
+                    AddRemoveMixin):
     queryset = Recipe.objects.all()
     serializer_class = RecipeCreateSerializer
     permission_classes = (AuthorPermission,)
-    pagination_class = UserPagination
+    pagination_class = RecipePagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    parser_classes = (JSONParser, MultiPartJSONParser, FormParser)
+    vary_headers = ('Authorization',)
+    user_flag_models = {
+        'is_favorited': Favorite,
+        'is_in_shopping_cart': ShoppingCart,
+    }
+    deferrable_fields = ('name', 'image', 'cooking_time', 'text')
+
+    def annotate_user_flags(self, queryset, names=None):
+        user = self.request.user
+        return queryset.annotate(**{
+            name: (
+                Exists(model.objects.filter(user=user,
+                                            recipe=OuterRef('pk')))
+                if user.is_authenticated
+                else Value(False, output_field=BooleanField())
+            )
+            for name, model in self.user_flag_models.items()
+            if names is None or name in names
+        })
+
+    def get_queryset(self):
+        fields = self.get_requested_fields(RecipeInfoSerializer)
+        queryset = super().get_queryset().defer(
+            *(set(self.deferrable_fields) - fields)
+        )
+        if 'author' in fields:
+            queryset = queryset.select_related('author')
+        if 'tags' in fields:
+            queryset = queryset.prefetch_related('tags')
+        if 'ingredients' in fields:
+            queryset = queryset.prefetch_related(Prefetch(
+                'ingredient_recipe_set',
+                queryset=IngredientRecipe.objects.select_related('ingredient')
+            ))
+        return self.annotate_user_flags(queryset, fields)
+
+    def get_validators(self, request, *args, **kwargs):
+        if self.action != 'retrieve':
+            return None, None
+        queryset = self.annotate_user_flags(Recipe.objects.filter(
+            pk=kwargs['pk']
+        ))
+        if request.user.is_authenticated:
+            queryset = queryset.annotate(is_subscribed=Exists(
+                Follow.objects.filter(user=request.user,
+                                      author=OuterRef('author'))
+            ))
+        else:
+            queryset = queryset.annotate(
+                is_subscribed=Value(False, output_field=BooleanField())
+            )
+        stamp = queryset.values_list('updated_at', 'is_favorited',
+                                     'is_in_shopping_cart',
+                                     'is_subscribed').first()
+        if stamp is None:
+            return None, None
+        updated_at, *flags = stamp
+        etag = make_etag('recipes.Recipe', kwargs['pk'],
+                         updated_at.timestamp(), *flags,
+                         request.get_full_path())
+        if request.user.is_authenticated:
+            return etag, None
+        return etag, updated_at
 
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -198,7 +514,11 @@ class RecipeViewSet(ModelViewSet, AddRemoveMixin):
             self.action in [
                 'favorite',
                 'shopping_cart',
+                'favorite_many',
+                'feed',
+                'shopping_cart_many',
                 'download_shopping_cart',
+                'shopping_cart_export',
                 'create',
                 'update'
             ]
@@ -208,33 +528,110 @@ class RecipeViewSet(ModelViewSet, AddRemoveMixin):
             self.permission_classes = (AuthorPermission,)
         return super().get_permissions()
 
+    def finalize_response(self, request, response, *args, **kwargs):
+        if (self.action == 'download_shopping_cart'
+                and isinstance(response, Response)
+                and response.status_code != status.HTTP_200_OK):
+            request.accepted_renderer = JSONRenderer()
+            request.accepted_media_type = JSONRenderer.media_type
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def get_feed_queryset(self, request):
+        strategy = request.query_params.get(FEED_STRATEGY_QUERY_PARAM,
+                                            settings.FEED_STRATEGY)
+        queryset = self.filter_queryset(self.get_queryset())
+        if strategy == FEED_READ_STRATEGY:
+            return queryset.filter(
+                author__following__user=request.user
+            ).annotate(feed_date=F('pub_date'))
+        if strategy == FEED_WRITE_STRATEGY:
+            return queryset.filter(
+                timeline_entries__user=request.user
+            ).annotate(feed_date=F('timeline_entries__pub_date'))
+        raise ValidationError({FEED_STRATEGY_QUERY_PARAM: [
+            f'Допустимые значения: {FEED_READ_STRATEGY}, '
+            f'{FEED_WRITE_STRATEGY}.'
+        ]})
+
     @action(detail=False, methods=['get'],
-            permission_classes=[AuthorPermission])
+            permission_classes=[IsAuthenticated],
+            pagination_class=FeedCursorPagination)
+    def feed(self, request):
+        page = self.paginate_queryset(self.get_feed_queryset(request))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    def is_async_export(self, request):
+        default = (ASYNC_EXPORT_MODE if settings.SHOPPING_LIST_EXPORT_ASYNC
+                   else '')
+        return request.query_params.get(
+            EXPORT_MODE_QUERY_PARAM, default
+        ) == ASYNC_EXPORT_MODE
+
+    @action(detail=False, methods=['get'],
+            permission_classes=[AuthorPermission],
+            renderer_classes=(PDFRenderer, PlainTextRenderer, CSVRenderer,
+                              ShoppingListJSONRenderer))
     def download_shopping_cart(self, request, *args, **kwargs):
-        ingredients = IngredientRecipe.objects.filter(
-            recipe__shopping_carts__user=request.user
-        ).values(
-            'ingredient__name',
-            'ingredient__measurement_unit'
-        ).annotate(
-            amount=Sum('amount')
-        ).order_by('ingredient__name')
-
-        shopping_list = generate_shopping_list(ingredients)
-        pdf_buffer = generate_pdf(shopping_list)
+        renderer = request.accepted_renderer
+        filename = f'shopping_list.{renderer.format}'
+        if renderer.format != PDFRenderer.format:
+            return StreamingHttpResponse(
+                SHOPPING_LIST_EXPORTERS[renderer.format](
+                    user_shopping_list(request.user).iterator()
+                ),
+                content_type=(f'{renderer.media_type}; '
+                              f'charset={renderer.charset}'),
+                headers={
+                    'Content-Disposition': content_disposition_header(
+                        True, filename
+                    )
+                }
+            )
 
+        lines = get_shopping_list_lines(request.user)
+        if self.is_async_export(request):
+            job = enqueue_export(request.user, lines)
+            data = ShoppingListExportSerializer(
+                job, context=self.get_serializer_context()
+            ).data
+            if job.status == ShoppingListExport.Status.DONE:
+                return redirect(data['url'])
+            return Response(data, status=status.HTTP_202_ACCEPTED,
+                            headers={'Location': data['url']})
         return FileResponse(
-            pdf_buffer,
+            open_export(render_export(lines, get_cart_hash(lines))),
             as_attachment=True,
-            filename='shopping_list.pdf',
-            content_type='application/pdf'
+            filename=filename,
+            content_type=renderer.media_type
         )
 
+    @action(detail=False, methods=['get'],
+            url_path=r'download_shopping_cart/(?P<job_id>[0-9a-f-]{36})')
+    def shopping_cart_export(self, request, job_id):
+        job = get_object_or_404(ShoppingListExport, pk=job_id,
+                                user=request.user)
+        if job.status != ShoppingListExport.Status.DONE:
+            return Response(
+                ShoppingListExportSerializer(
+                    job, context=self.get_serializer_context()
+                ).data,
+                status=(status.HTTP_200_OK
+                        if job.status == ShoppingListExport.Status.FAILED
+                        else status.HTTP_202_ACCEPTED)
+            )
+        try:
+            file = open_export(job.file_name)
+        except FileNotFoundError:
+            raise NotFound('Файл выгрузки больше недоступен.')
+        return FileResponse(file, as_attachment=True,
+                            filename='shopping_list.pdf',
+                            content_type=PDFRenderer.media_type)
+
     @action(detail=True, methods=['get'], url_path='get-link')
     def get_link(self, request, *args, **kwargs):
-        get_object_or_404(Recipe, pk=kwargs["pk"])
-        link = create_short_link(kwargs["pk"])
-        link = f'{request.META["HTTP_HOST"]}/s/{link}'
+        recipe = get_object_or_404(Recipe.objects.only('pk'), pk=kwargs["pk"])
+        link = f'{request.META["HTTP_HOST"]}/s/{encode_short_link(recipe.pk)}'
         return Response(status=status.HTTP_200_OK, data={"short-link": link})
 
     @action(detail=True, methods=['POST', 'DELETE'],
@@ -255,9 +652,21 @@ class RecipeViewSet(ModelViewSet, AddRemoveMixin):
             error_message="Recipe not in shopping cart."
         )
 
+    @action(detail=False, methods=['POST', 'DELETE'],
+            url_path='favorite', permission_classes=[IsAuthenticated])
+    def favorite_many(self, request):
+        return self.add_remove_many(request, Favorite)
+
+    @action(detail=False, methods=['POST', 'DELETE'],
+            url_path='shopping_cart', permission_classes=[IsAuthenticated])
+    def shopping_cart_many(self, request):
+        return self.add_remove_many(request, ShoppingCart)
+
 
 @api_view(['GET'])
 def get_recipe(request, short_link):
-    link = get_object_or_404(ShortLink, link=short_link)
+    recipe_id = decode_short_link(short_link)
+    if recipe_id is None:
+        recipe_id = get_object_or_404(ShortLink, link=short_link).recipe_id
     return redirect(
-        f'https://{request.META["HTTP_HOST"]}/recipes/{link.recipe_id}/')
+        f'https://{request.META["HTTP_HOST"]}/recipes/{recipe_id}/')
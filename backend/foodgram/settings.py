@@ -13,6 +13,8 @@ DATA_DIR = BASE_DIR / 'data'
 
 SECRET_KEY = os.getenv('SECRET_KEY', default=get_random_secret_key())
 
+SHORT_LINK_KEY = os.getenv('SHORT_LINK_KEY', '')
+
 DEBUG = os.getenv('DEBUG', 'false').lower() == 'true'
 
 ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
@@ -89,6 +91,42 @@ else:
         }
     }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+RECIPE_CACHE_ALIAS = os.getenv('RECIPE_CACHE_ALIAS', 'default')
+
+RECIPE_CACHE_TIMEOUT = int(os.getenv('RECIPE_CACHE_TIMEOUT', 60 * 60 * 24))
+
+RECIPE_CACHE_STATS_BATCH = int(os.getenv('RECIPE_CACHE_STATS_BATCH', 100))
+
+LOCAL_CATALOG_CHECK_INTERVAL = int(
+    os.getenv('LOCAL_CATALOG_CHECK_INTERVAL', 10)
+)
+
+INGREDIENT_PREFIX_INDEX = (
+    os.getenv('INGREDIENT_PREFIX_INDEX', 'true').lower() == 'true'
+)
+
+WORKER_POOL_SIZE = int(os.getenv('WORKER_POOL_SIZE', 2))
+
+SHOPPING_LIST_EXPORT_ASYNC = (
+    os.getenv('SHOPPING_LIST_EXPORT_ASYNC', 'false').lower() == 'true'
+)
+
+FEED_STRATEGY = os.getenv('FEED_STRATEGY', 'read')
+
+AUTH_USER_CACHE_SIZE = int(os.getenv('AUTH_USER_CACHE_SIZE', 1024))
+
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', 30))
+
 AUTH_USER_MODEL = 'users.User'
 
 
@@ -114,6 +152,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        'api.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.TokenAuthentication',
     ],
     'DEFAULT_FILTER_BACKENDS': [
@@ -131,7 +170,7 @@ USE_TZ = True
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
-    'AUTH_HEADER_TYPES': ('Bearer',),
+    'AUTH_HEADER_TYPES': ('Bearer', 'Token'),
 }
 
 
@@ -144,6 +183,21 @@ STATICFILES_DIRS = ((BASE_DIR / 'static/'),)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+EXPORT_ROOT = os.getenv('EXPORT_ROOT', os.path.join(BASE_DIR, 'exports'))
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'recipes.storage.ContentHashStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+    'exports': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        'OPTIONS': {'location': EXPORT_ROOT, 'base_url': None},
+    },
+}
+
 
 DEFAULT_FROM_EMAIL = 'foodgram@foodgram.com'
 
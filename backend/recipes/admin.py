@@ -1,8 +1,10 @@
 from django.contrib import admin
-from django.db.models import Count
+from django.utils import timezone
 
 from .models import (Favorite, Ingredient, IngredientRecipe, Recipe,
-                     ShoppingCart, ShortLink, Tag)
+                     ShoppingCart, ShoppingListExport, ShoppingListItem,
+                     ShortLink, StoredFile, Tag)
+from .shopping_lists import change_recipe_shopping_lists, recipe_amounts
 
 
 class IngredientInline(admin.TabularInline):
@@ -15,16 +17,21 @@ class RecipeAdmin(admin.ModelAdmin):
     list_display = ['name', 'author', 'favorite_count', 'get_ingredients']
     search_fields = ['name', 'author__name']
     list_filter = ['tags']
+    readonly_fields = ['favorites_count', 'shopping_cart_count']
     inlines = (IngredientInline,)
 
-    def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        queryset = queryset.annotate(favorite_count=Count('favorites'))
-        return queryset
+    def save_related(self, request, form, formsets, change):
+        old_amounts = recipe_amounts(form.instance.pk)
+        super().save_related(request, form, formsets, change)
+        change_recipe_shopping_lists(form.instance.pk, old_amounts)
+        Recipe.objects.filter(pk=form.instance.pk).update(
+            updated_at=timezone.now()
+        )
 
-    @admin.display(description='Число добавлений рецепта в избранное')
+    @admin.display(description='Число добавлений рецепта в избранное',
+                   ordering='favorites_count')
     def favorite_count(self, obj):
-        return obj.favorite_count
+        return obj.favorites_count
 
     @admin.display(description='Ингредиенты')
     def get_ingredients(self, obj):
@@ -60,8 +67,54 @@ class IngredientRecipeAdmin(admin.ModelAdmin):
     search_fields = ['ingredient__name', 'recipe__name']
     list_filter = ['ingredient', 'recipe']
 
+    def save_model(self, request, obj, form, change):
+        old_amounts = recipe_amounts(obj.recipe_id)
+        if change:
+            old_recipe_id = IngredientRecipe.objects.get(pk=obj.pk).recipe_id
+            old_recipe_amounts = recipe_amounts(old_recipe_id)
+        super().save_model(request, obj, form, change)
+        change_recipe_shopping_lists(obj.recipe_id, old_amounts)
+        if change and old_recipe_id != obj.recipe_id:
+            change_recipe_shopping_lists(old_recipe_id, old_recipe_amounts)
+
+    def delete_model(self, request, obj):
+        old_amounts = recipe_amounts(obj.recipe_id)
+        super().delete_model(request, obj)
+        change_recipe_shopping_lists(obj.recipe_id, old_amounts)
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = set(queryset.values_list('recipe_id', flat=True))
+        old_amounts = {
+            recipe_id: recipe_amounts(recipe_id) for recipe_id in recipe_ids
+        }
+        super().delete_queryset(request, queryset)
+        for recipe_id, amounts in old_amounts.items():
+            change_recipe_shopping_lists(recipe_id, amounts)
+
+
+@admin.register(ShoppingListItem)
+class ShoppingListItemAdmin(admin.ModelAdmin):
+    list_display = ['user', 'ingredient', 'amount']
+    search_fields = ['user__username', 'ingredient__name']
+    readonly_fields = ['user', 'ingredient', 'amount']
+
+
+@admin.register(ShoppingListExport)
+class ShoppingListExportAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'status', 'created_at', 'updated_at']
+    search_fields = ['user__username', 'cart_hash']
+    list_filter = ['status']
+    readonly_fields = ['user', 'cart_hash', 'status', 'error']
+
 
 @admin.register(ShortLink)
 class ShortLinkAdmin(admin.ModelAdmin):
     search_fields = ['link', 'recipe__name']
     list_filter = ['recipe']
+
+
+@admin.register(StoredFile)
+class StoredFileAdmin(admin.ModelAdmin):
+    list_display = ['name', 'references']
+    search_fields = ['name']
+    readonly_fields = ['name', 'references']
@@ -12,3 +12,70 @@ MAX_AMOUNT_LIMIT = 1
 RESTRICTED_USERNAME = 'me'
 USERNAME_REGEX = r'^[\w.@+-]+\Z'
 DEFAULT_LIMIT_PAGINATION = 6
+PAGINATION_MODE_QUERY_PARAM = 'pagination'
+CURSOR_PAGINATION_MODE = 'cursor'
+RECIPE_CACHE_VERSION = 2
+RECIPE_CACHE_KEY = 'recipe:{version}:{id}:{stamp}:{image_size}'
+RECIPE_CACHE_STATS_KEY = 'recipe-cache:{}'
+FIELDS_QUERY_PARAM = 'fields'
+OMIT_QUERY_PARAM = 'omit'
+TAG_IDS_CACHE_KEY = 'tag-ids'
+TAG_IDS_CACHE_TIMEOUT = 60 * 60
+TAGS_MATCH_ANY = 'any'
+TAGS_MATCH_ALL = 'all'
+LOADER_BATCH_SIZE = 5000
+LOADER_JSON_CHUNK_SIZE = 64 * 1024
+PDF_FONT_NAME = 'Anticva'
+PDF_FONT_SIZE = 16
+PDF_LINE_HEIGHT = 15
+PDF_MARGIN = 40
+PDF_SPOOL_MAX_SIZE = 1024 * 1024
+EXPORT_STATUS_MAX_LENGTH = 16
+EXPORT_HASH_LENGTH = 64
+EXPORT_STORAGE = 'exports'
+EXPORT_MODE_QUERY_PARAM = 'mode'
+ASYNC_EXPORT_MODE = 'async'
+EXPORT_STALE_AFTER = 10 * 60
+EXPORT_PURGE_DAYS = 1
+RECIPE_BATCH_MAX_SIZE = 100
+BATCH_ADDED = 'added'
+BATCH_ALREADY_ADDED = 'already_added'
+BATCH_REMOVED = 'removed'
+BATCH_NOT_ADDED = 'not_added'
+BATCH_NOT_FOUND = 'not_found'
+RECIPES_LIMIT_QUERY_PARAM = 'recipes_limit'
+FEED_STRATEGY_QUERY_PARAM = 'strategy'
+FEED_READ_STRATEGY = 'read'
+FEED_WRITE_STRATEGY = 'write'
+TIMELINE_BATCH_SIZE = 1000
+JWT_PASSWORD_CLAIM = 'pwd'
+JWT_VERSION_CLAIM = 'ver'
+IMAGE_MAX_SIZE = 5 * 1024 * 1024
+AVATAR_MAX_SIZE = 2 * 1024 * 1024
+IMAGE_SPOOL_MAX_SIZE = 1024 * 1024
+BASE64_CHUNK_SIZE = 64 * 1024
+IMAGE_SIZE_QUERY_PARAM = 'image_size'
+ORIGINAL_IMAGE = 'original'
+CARD_IMAGE = 'card'
+DETAIL_IMAGE = 'detail'
+AVATAR_IMAGE = 'avatar'
+IMAGE_VARIANTS = {
+    CARD_IMAGE: (480, 480),
+    DETAIL_IMAGE: (1200, 1200),
+    AVATAR_IMAGE: (160, 160),
+}
+RECIPE_IMAGE_VARIANTS = (CARD_IMAGE, DETAIL_IMAGE)
+AVATAR_IMAGE_VARIANTS = (AVATAR_IMAGE,)
+IMAGE_VARIANT_FORMAT = 'webp'
+IMAGE_VARIANT_QUALITY = 80
+MULTIPART_JSON_FIELD = 'data'
+CONTENT_HASH_CHUNK_SIZE = 64 * 1024
+STORED_FILE_NAME_MAX_LENGTH = 255
+SHORT_LINK_LENGTH = 7
+SHORT_LINK_ALPHABET = (
+    '0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+)
+SHORT_LINK_HALF_BITS = 20
+SHORT_LINK_CHECK_BITS = 10
+SHORT_LINK_ROUNDS = 4
+SHORT_LINK_SALT = 'recipes.short_link'
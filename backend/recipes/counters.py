@@ -0,0 +1,43 @@
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from recipes.shopping_lists import lock_users
+
+
+def change_counter(queryset, field, delta):
+    queryset.update(**{field: Greatest(F(field) + delta, 0)})
+
+
+def delete_counted(queryset, user_ids):
+    with transaction.atomic():
+        lock_users(user_ids)
+        return queryset.delete()[0]
+
+
+def count_related(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(count=Count('pk'))
+            .values('count')
+        ),
+        0
+    )
+
+
+def recount_recipe_counters(recipe_model, favorite_model,
+                            shopping_cart_model):
+    return recipe_model.objects.update(
+        favorites_count=count_related(favorite_model, 'recipe'),
+        shopping_cart_count=count_related(shopping_cart_model, 'recipe')
+    )
+
+
+def recount_user_counters(user_model, recipe_model, follow_model):
+    return user_model.objects.update(
+        recipes_count=count_related(recipe_model, 'author'),
+        followers_count=count_related(follow_model, 'author')
+    )
@@ -0,0 +1,11 @@
+from statistics import median
+from time import perf_counter
+
+
+def measure(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = perf_counter()
+        function()
+        timings.append(perf_counter() - started)
+    return median(timings) * 1000
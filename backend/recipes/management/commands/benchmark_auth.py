@@ -0,0 +1,60 @@
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from api.authentication import get_access_token
+from api.utils.user_cache import user_cache
+from recipes.management.benchmarking import measure
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает число аутентифицированных запросов в секунду '
+            'с токеном DRF и с JWT через кэш пользователей')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='/api/users/me/',
+                            help='Адрес запроса')
+        parser.add_argument('--repeat', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.stdout.write('схема | запросов в секунду | запросов к БД')
+        with transaction.atomic():
+            user = User.objects.create_user(
+                username='auth-benchmark', email='auth-benchmark@example.com',
+                password='auth-benchmark-password'
+            )
+            for scheme, token in (
+                ('DRF Token', Token.objects.create(user=user).key),
+                ('JWT', str(get_access_token(user))),
+            ):
+                self.stdout.write(' | '.join(
+                    f'{value:.1f}' if isinstance(value, float) else str(value)
+                    for value in self.run(scheme, token, options)
+                ))
+            transaction.set_rollback(True)
+        user_cache.invalidate(user.pk)
+
+    def run(self, scheme, token, options):
+        factory = APIRequestFactory()
+        match = resolve(options['url'])
+
+        def send():
+            response = match.func(factory.get(
+                options['url'], HTTP_AUTHORIZATION=f'Token {token}'
+            ), *match.args, **match.kwargs)
+            response.render()
+            if response.status_code != 200:
+                raise CommandError(
+                    f'{scheme}: ответ {response.status_code} '
+                    f'на {options["url"]}'
+                )
+
+        send()
+        with CaptureQueriesContext(connection) as queries:
+            send()
+        return (scheme, 1000 / measure(send, options['repeat']),
+                len(queries))
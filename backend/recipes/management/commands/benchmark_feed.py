@@ -0,0 +1,83 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from recipes.constants import DEFAULT_LIMIT_PAGINATION
+from recipes.management.benchmarking import measure
+from recipes.models import Recipe, TimelineEntry
+from recipes.timelines import backfill_timeline, fan_out_recipe
+from users.models import Follow, User
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает стратегии ленты подписок (чтение через Follow '
+            'и запись в ленту) на синтетических данных')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--followers', nargs='+', type=int,
+                            default=[10, 100, 1000, 5000],
+                            help='Число подписчиков автора')
+        parser.add_argument('--authors', type=int, default=50,
+                            help='Число авторов в подписках читателя')
+        parser.add_argument('--recipes', type=int, default=20,
+                            help='Число рецептов у каждого автора')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            'подписчиков | публикация, мс | чтение: read, мс | '
+            'чтение: write, мс | записей ленты'
+        )
+        for followers in options['followers']:
+            with transaction.atomic():
+                self.stdout.write(' | '.join(
+                    str(value) if isinstance(value, int) else f'{value:.2f}'
+                    for value in self.run(followers, options)
+                ))
+                transaction.set_rollback(True)
+
+    def run(self, followers, options):
+        users = User.objects.bulk_create(
+            User(username=f'feed-benchmark-{index}',
+                 email=f'feed-benchmark-{index}@example.com',
+                 password='!')
+            for index in range(followers + options['authors'])
+        )
+        authors, readers = users[:options['authors']], users[
+            options['authors']:
+        ]
+        Recipe.objects.bulk_create(
+            Recipe(author=author, name=f'{author.username}-{index}',
+                   text='-', cooking_time=1)
+            for author in authors for index in range(options['recipes'])
+        )
+        reader, star = readers[0], authors[0]
+        Follow.objects.bulk_create(
+            [Follow(user=reader, author=author) for author in authors[1:]]
+            + [Follow(user=user, author=star) for user in readers]
+        )
+        for author in authors[1:]:
+            backfill_timeline(reader.pk, author.pk)
+        for user in readers:
+            backfill_timeline(user.pk, star.pk)
+
+        def publish():
+            recipe = Recipe(author=star, name='-', text='-', cooking_time=1)
+            Recipe.objects.bulk_create([recipe])
+            fan_out_recipe(recipe)
+
+        page_size = DEFAULT_LIMIT_PAGINATION
+        return (
+            followers,
+            measure(publish, options['repeat']),
+            measure(lambda: list(
+                Recipe.objects.filter(author__following__user=reader)
+                .order_by('-pub_date', '-id')
+                .values_list('id', flat=True)[:page_size]
+            ), options['repeat']),
+            measure(lambda: list(
+                Recipe.objects.filter(timeline_entries__user=reader)
+                .order_by('-timeline_entries__pub_date', '-id')
+                .values_list('id', flat=True)[:page_size]
+            ), options['repeat']),
+            TimelineEntry.objects.count(),
+        )
@@ -0,0 +1,47 @@
+from time import perf_counter
+
+from django.core.management import BaseCommand
+
+from api.utils.generate_shopping_list import (generate_pdf,
+                                              generate_shopping_list,
+                                              register_font)
+from recipes.management.benchmarking import measure
+
+
+def make_ingredients(count):
+    return [
+        {'ingredient__name': f'Ингредиент номер {index} с длинным названием '
+                             f'для переноса строки',
+         'amount': index % 1000 + 1,
+         'ingredient__measurement_unit': 'г'}
+        for index in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Измеряет время генерации PDF со списком покупок по числу строк'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', nargs='+', type=int,
+                            default=[10, 100, 1000, 5000],
+                            help='Число строк в списке покупок')
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        register_font()
+        self.stdout.write(
+            f'регистрация шрифта: {(perf_counter() - started) * 1000:.2f} мс'
+        )
+        self.stdout.write('строк | PDF, мс | мс на 1000 строк | размер, КБ')
+        for count in options['lines']:
+            ingredients = make_ingredients(count)
+            lines = list(generate_shopping_list(ingredients))
+            elapsed = measure(lambda: generate_pdf(lines).close(),
+                              options['repeat'])
+            with generate_pdf(lines) as buffer:
+                size = len(buffer.read()) / 1024
+            self.stdout.write(
+                f'{count} | {elapsed:.2f} | {elapsed * 1000 / count:.2f} | '
+                f'{size:.1f}'
+            )
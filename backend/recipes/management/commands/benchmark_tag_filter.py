@@ -0,0 +1,93 @@
+from django.core.cache import cache
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.http import QueryDict
+
+from api.filters import RecipeFilter
+from recipes.constants import (DEFAULT_LIMIT_PAGINATION, TAG_IDS_CACHE_KEY,
+                               TAGS_MATCH_ALL, TAGS_MATCH_ANY)
+from recipes.management.benchmarking import measure
+from recipes.models import Recipe, Tag
+from users.models import User
+
+
+def fetch_page(queryset):
+    page_size = DEFAULT_LIMIT_PAGINATION
+    return queryset.count(), list(
+        queryset.order_by('-pub_date', '-id')
+        .values_list('id', flat=True)[:page_size]
+    )
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает фильтр рецептов по 1, 3 и 5 тегам: JOIN с DISTINCT '
+            'и EXISTS по кэшированным id тегов, на синтетических данных')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tag-counts', nargs='+', type=int,
+                            default=[1, 3, 5],
+                            help='Число тегов в фильтре')
+        parser.add_argument('--recipes', type=int, default=5000,
+                            help='Число рецептов')
+        parser.add_argument('--tags', type=int, default=10,
+                            help='Число тегов в базе')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            'тегов | JOIN + DISTINCT, мс | EXISTS any, мс | '
+            'EXISTS all, мс | рецептов: any / all'
+        )
+        with transaction.atomic():
+            slugs = self.seed(options)
+            for tag_count in options['tag_counts']:
+                self.stdout.write(' | '.join(
+                    f'{value:.2f}' if isinstance(value, float) else str(value)
+                    for value in self.run(slugs[:tag_count], options)
+                ))
+            transaction.set_rollback(True)
+        cache.delete(TAG_IDS_CACHE_KEY)
+
+    def seed(self, options):
+        author = User.objects.create(
+            username='tag-benchmark', email='tag-benchmark@example.com',
+            password='!'
+        )
+        tags = Tag.objects.bulk_create(
+            Tag(name=f'tag-benchmark-{index}', slug=f'tag-benchmark-{index}')
+            for index in range(options['tags'])
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(author=author, name=f'tag-benchmark-{index}', text='-',
+                   cooking_time=1)
+            for index in range(options['recipes'])
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag=tags[tag_index])
+            for index, recipe in enumerate(recipes)
+            for tag_index in range(len(tags))
+            if index >> tag_index & 1
+        )
+        cache.delete(TAG_IDS_CACHE_KEY)
+        return [tag.slug for tag in tags]
+
+    def run(self, slugs, options):
+        def filtered(match):
+            data = QueryDict(mutable=True)
+            data.setlist('tags', slugs)
+            data['tags_match'] = match
+            return RecipeFilter(data, queryset=Recipe.objects.all()).qs
+
+        counts = [fetch_page(filtered(match))[0]
+                  for match in (TAGS_MATCH_ANY, TAGS_MATCH_ALL)]
+        return (
+            len(slugs),
+            measure(lambda: fetch_page(
+                Recipe.objects.filter(tags__slug__in=slugs).distinct()
+            ), options['repeat']),
+            measure(lambda: fetch_page(filtered(TAGS_MATCH_ANY)),
+                    options['repeat']),
+            measure(lambda: fetch_page(filtered(TAGS_MATCH_ALL)),
+                    options['repeat']),
+            f'{counts[0]} / {counts[1]}',
+        )
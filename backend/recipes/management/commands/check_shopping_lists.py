@@ -0,0 +1,43 @@
+from django.core.management import BaseCommand
+
+from recipes.models import IngredientRecipe, ShoppingListItem
+from recipes.shopping_lists import (rebuild_shopping_lists,
+                                    shopping_list_items, shopping_list_totals)
+
+
+class Command(BaseCommand):
+    help = 'Сверяет сохраненные списки покупок с корзинами пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Пересобрать списки покупок с расхождениями'
+        )
+
+    def handle(self, *args, **options):
+        expected = shopping_list_totals(IngredientRecipe)
+        actual = shopping_list_items(ShoppingListItem)
+        mismatches = {
+            key: (actual.get(key), expected.get(key))
+            for key in expected.keys() | actual.keys()
+            if actual.get(key) != expected.get(key)
+        }
+        for (user_id, ingredient_id), (stored, live) in sorted(
+            mismatches.items()
+        ):
+            self.stdout.write(
+                f'Пользователь {user_id}, ингредиент {ingredient_id}: '
+                f'сохранено {stored}, по корзине {live}'
+            )
+        user_ids = {user_id for user_id, _ in mismatches}
+        self.stdout.write(
+            f'Расхождений: {len(mismatches)}, '
+            f'пользователей: {len(user_ids)}'
+        )
+        if options['fix'] and user_ids:
+            rebuild_shopping_lists(ShoppingListItem, IngredientRecipe,
+                                   user_ids)
+            self.stdout.write(
+                self.style.SUCCESS('Списки покупок пересобраны')
+            )
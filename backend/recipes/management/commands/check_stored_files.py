@@ -0,0 +1,35 @@
+from django.core.management import BaseCommand
+
+from recipes.media_files import (MEDIA_FIELDS, rebuild_stored_files,
+                                 stored_file_references)
+from recipes.models import StoredFile
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счетчики ссылок на медиафайлы с рецептами и аватарами'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Пересчитать ссылки на медиафайлы'
+        )
+
+    def handle(self, *args, **options):
+        expected = stored_file_references(MEDIA_FIELDS)
+        actual = dict(StoredFile.objects.values_list('name', 'references'))
+        mismatches = {
+            name: (actual.get(name), expected.get(name))
+            for name in expected.keys() | actual.keys()
+            if actual.get(name) != expected.get(name)
+        }
+        for name, (stored, live) in sorted(mismatches.items()):
+            self.stdout.write(
+                f'{name}: сохранено {stored}, по записям {live}'
+            )
+        self.stdout.write(f'Расхождений: {len(mismatches)}')
+        if options['fix'] and mismatches:
+            rebuild_stored_files(StoredFile, MEDIA_FIELDS)
+            self.stdout.write(
+                self.style.SUCCESS('Счетчики ссылок пересчитаны')
+            )
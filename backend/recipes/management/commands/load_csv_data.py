@@ -1,28 +1,177 @@
 import csv
+import json
 import logging
+import re
+from io import StringIO
+from itertools import islice
+from pathlib import Path
+from time import perf_counter
 
 from django.conf import settings
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
 
+from recipes.constants import (LOADER_BATCH_SIZE, LOADER_JSON_CHUNK_SIZE,
+                               MEASUREMENT_UNIT_MAX_LENGTH, NAME_MAX_LENGTH)
 from recipes.models import Ingredient
 
-DATA_NAMES = {
-    Ingredient: 'ingredients.csv',
-}
+DEFAULT_FILE = 'ingredients.csv'
+SEPARATOR = re.compile(r'[\s,]*')
+FORMATS = {'.csv': 'csv', '.json': 'json', '.jsonl': 'jsonl',
+           '.ndjson': 'jsonl'}
+
+logger = logging.getLogger(__name__)
+
+
+def get_item_fields(item):
+    if isinstance(item, dict):
+        name = item.get('name')
+        measurement_unit = item.get('measurement_unit')
+        if isinstance(name, str) and isinstance(measurement_unit, str):
+            return name, measurement_unit
+    logger.warning('Пропущен элемент: %r', item)
+    return None
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if len(row) >= 2:
+            yield row[0], row[1]
+        else:
+            logger.warning('Пропущена строка: %s', ','.join(row))
+            yield None
+
+
+def read_jsonl(file):
+    for line in file:
+        if line.strip():
+            yield get_item_fields(json.loads(line))
+
+
+def read_json(file):
+    decoder = json.JSONDecoder()
+    buffer = file.read(LOADER_JSON_CHUNK_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('Ожидался JSON-массив объектов')
+    position = 1
+    while True:
+        position = SEPARATOR.match(buffer, position).end()
+        if buffer.startswith(']', position):
+            return
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            chunk = file.read(LOADER_JSON_CHUNK_SIZE)
+            if not chunk:
+                raise CommandError('JSON-файл оборван')
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield get_item_fields(item)
+
+
+READERS = {'csv': read_csv, 'json': read_json, 'jsonl': read_jsonl}
+
+
+def batched(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
 
 
 class Command(BaseCommand):
-    def handle(self, *args, **kwargs):
-        logger = logging.getLogger(__name__)
-        for model, csv_filename in DATA_NAMES.items():
-            with open(settings.DATA_DIR / csv_filename, 'r',
-                      encoding='utf-8') as csv_file:
-                reader = csv.reader(csv_file)
-                data_to_insert = [
-                    model(
-                        name=row[0],
-                        measurement_unit=row[1]
-                    ) for row in reader
-                ]
-                model.objects.bulk_create(data_to_insert)
-                logger.info('Данные из csv-файла были успешно загружены')
+    help = 'Загружает ингредиенты из файлов CSV, JSON или JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths', nargs='*', type=Path,
+            help=f'Файлы с данными, по умолчанию {DEFAULT_FILE} '
+                 'из DATA_DIR'
+        )
+        parser.add_argument('--format', choices=sorted(READERS),
+                            help='Формат файлов, по умолчанию '
+                                 'определяется по расширению')
+        parser.add_argument('--batch-size', type=int,
+                            default=LOADER_BATCH_SIZE)
+        parser.add_argument('--no-copy', action='store_true',
+                            help='Не использовать COPY на PostgreSQL')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or [settings.DATA_DIR / DEFAULT_FILE]
+        use_copy = (connection.vendor == 'postgresql'
+                    and not options['no_copy'])
+        count_before = Ingredient.objects.count()
+        started = perf_counter()
+        processed = self.skipped = 0
+        for path in paths:
+            file_format = options['format'] or FORMATS.get(
+                path.suffix.lower()
+            )
+            if file_format is None:
+                raise CommandError(f'Неизвестный формат файла: {path}')
+            with open(path, 'r', encoding='utf-8') as file:
+                rows = self.clean(READERS[file_format](file))
+                batches = batched(rows, options['batch_size'])
+                if use_copy:
+                    processed += self.copy(batches)
+                else:
+                    processed += self.insert(batches)
+        elapsed = perf_counter() - started
+        created = Ingredient.objects.count() - count_before
+        self.stdout.write(
+            f'Обработано строк: {processed}, пропущено: {self.skipped}, '
+            f'добавлено: {created}, '
+            f'{processed / elapsed if elapsed else processed:.0f} строк/с'
+        )
+        logger.info('Данные были успешно загружены')
+
+    def clean(self, rows):
+        for row in rows:
+            if row is None:
+                self.skipped += 1
+                continue
+            name, measurement_unit = (value.strip() for value in row)
+            if (name and measurement_unit
+                    and len(name) <= NAME_MAX_LENGTH
+                    and len(measurement_unit) <= MEASUREMENT_UNIT_MAX_LENGTH):
+                yield name, measurement_unit
+            else:
+                self.skipped += 1
+                logger.warning('Пропущена строка: %s, %s', name,
+                               measurement_unit)
+
+    def insert(self, batches):
+        processed = 0
+        for batch in batches:
+            Ingredient.objects.bulk_create(
+                (Ingredient(name=name, measurement_unit=measurement_unit)
+                 for name, measurement_unit in batch),
+                ignore_conflicts=True
+            )
+            processed += len(batch)
+        return processed
+
+    def copy(self, batches):
+        table = connection.ops.quote_name(Ingredient._meta.db_table)
+        processed = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE ingredient_staging '
+                '(name text, measurement_unit text) ON COMMIT DROP'
+            )
+            for batch in batches:
+                buffer = StringIO()
+                csv.writer(buffer).writerows(batch)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    'COPY ingredient_staging (name, measurement_unit) '
+                    'FROM STDIN WITH (FORMAT csv)', buffer
+                )
+                processed += len(batch)
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit, updated_at) '
+                'SELECT DISTINCT name, measurement_unit, now() '
+                'FROM ingredient_staging '
+                'ON CONFLICT (name, measurement_unit) DO NOTHING'
+            )
+        return processed
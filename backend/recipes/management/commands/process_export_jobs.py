@@ -0,0 +1,46 @@
+from django.core.management import BaseCommand
+
+from api.utils.export_jobs import (get_stale_exports, purge_exports,
+                                   recover_export)
+from recipes.constants import EXPORT_PURGE_DAYS, EXPORT_STALE_AFTER
+from recipes.models import ShoppingListExport
+
+
+class Command(BaseCommand):
+    help = ('Дорабатывает зависшие выгрузки списков покупок '
+            'и удаляет устаревшие')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale-after',
+            type=int,
+            default=EXPORT_STALE_AFTER,
+            help='Через сколько секунд незавершенная выгрузка '
+                 'считается зависшей'
+        )
+        parser.add_argument(
+            '--purge-days',
+            type=int,
+            default=EXPORT_PURGE_DAYS,
+            help='Удалить задания и файлы выгрузок старше указанного '
+                 'числа дней'
+        )
+
+    def handle(self, *args, **options):
+        recovered = failed = 0
+        for job in get_stale_exports(options['stale_after']):
+            job = recover_export(job)
+            if job.status == ShoppingListExport.Status.DONE:
+                recovered += 1
+            else:
+                failed += 1
+        self.stdout.write(
+            f'Дообработано выгрузок: {recovered}, с ошибкой: {failed}'
+        )
+        self.purge(options['purge_days'])
+
+    def purge(self, days):
+        deleted, removed = purge_exports(days)
+        self.stdout.write(
+            f'Удалено выгрузок: {deleted}, файлов: {removed}'
+        )
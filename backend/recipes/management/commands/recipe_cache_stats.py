@@ -0,0 +1,28 @@
+from django.core.management import BaseCommand
+
+from api.utils import recipe_cache
+
+
+class Command(BaseCommand):
+    help = 'Показывает счетчики попаданий и промахов кэша рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true',
+                            help='Сбросить счетчики после вывода')
+
+    def handle(self, *args, **options):
+        if not recipe_cache.is_shared_cache():
+            self.stderr.write(
+                'Кэш рецептов хранится в памяти процесса: счетчики '
+                'веб-процессов здесь не видны. Укажите общий кэш в '
+                'CACHE_BACKEND и CACHE_LOCATION (например, Redis).'
+            )
+        stats = recipe_cache.get_stats()
+        total = stats['hits'] + stats['misses']
+        ratio = stats['hits'] / total if total else 0
+        self.stdout.write(
+            f'hits: {stats["hits"]}, misses: {stats["misses"]}, '
+            f'hit ratio: {ratio:.2%}'
+        )
+        if options['reset']:
+            recipe_cache.reset_stats()
@@ -0,0 +1,17 @@
+from django.core.management import BaseCommand
+
+from recipes.counters import recount_recipe_counters, recount_user_counters
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow, User
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики избранного, корзин, рецептов и подписчиков'
+
+    def handle(self, *args, **options):
+        recipes = recount_recipe_counters(Recipe, Favorite, ShoppingCart)
+        users = recount_user_counters(User, Recipe, Follow)
+        self.stdout.write(
+            f'Пересчитаны счетчики: рецептов {recipes}, '
+            f'пользователей {users}'
+        )
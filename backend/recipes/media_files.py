@@ -0,0 +1,92 @@
+from collections import Counter
+from functools import partial
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+
+from recipes.models import Recipe, StoredFile, User
+
+MEDIA_FIELDS = {
+    Recipe: 'image',
+    User: 'avatar',
+}
+
+
+def stored_file_references(models):
+    references = Counter()
+    for model, field in models.items():
+        references.update(
+            model.objects.exclude(**{field: ''})
+            .exclude(**{f'{field}__isnull': True})
+            .values_list(field, flat=True)
+        )
+    return references
+
+
+def rebuild_stored_files(stored_file_model, models):
+    with transaction.atomic():
+        stored_file_model.objects.all().delete()
+        return len(stored_file_model.objects.bulk_create(
+            stored_file_model(name=name, references=references)
+            for name, references in stored_file_references(models).items()
+        ))
+
+
+def acquire_file(name):
+    if not name:
+        return
+    StoredFile.objects.bulk_create([StoredFile(name=name)],
+                                   ignore_conflicts=True)
+    StoredFile.objects.filter(name=name).update(
+        references=F('references') + 1
+    )
+
+
+def release_file(name):
+    if not name:
+        return
+    with transaction.atomic():
+        StoredFile.objects.filter(name=name, references__gt=0).update(
+            references=F('references') - 1
+        )
+        deleted, _ = StoredFile.objects.filter(name=name,
+                                               references=0).delete()
+    if deleted:
+        transaction.on_commit(partial(delete_unreferenced_file, name))
+
+
+def delete_unreferenced_file(name):
+    if not StoredFile.objects.filter(name=name).exists():
+        default_storage.delete(name)
+
+
+def get_file_name(instance):
+    value = instance.__dict__[MEDIA_FIELDS[type(instance)]]
+    return getattr(value, 'name', value) or ''
+
+
+def get_saved_file_name(instance):
+    return type(instance).objects.filter(pk=instance.pk).values_list(
+        MEDIA_FIELDS[type(instance)], flat=True
+    ).first() or ''
+
+
+def is_file_saved(instance, update_fields):
+    field = MEDIA_FIELDS[type(instance)]
+    return field in instance.__dict__ and (update_fields is None
+                                           or field in update_fields)
+
+
+def remember_saved_file(instance):
+    instance._saved_file_name = (
+        '' if instance._state.adding else get_saved_file_name(instance)
+    )
+
+
+def track_file_change(instance):
+    name = get_file_name(instance)
+    previous = instance.__dict__.pop('_saved_file_name', '')
+    if name != previous:
+        acquire_file(name)
+        release_file(previous)
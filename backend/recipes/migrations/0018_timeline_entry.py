@@ -0,0 +1,58 @@
+# Generated by Django 5.0.7 on 2026-10-18 06:36
+
+from itertools import islice
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def fill_timelines(apps, schema_editor):
+    TimelineEntry = apps.get_model('recipes', 'TimelineEntry')
+    Follow = apps.get_model('users', 'Follow')
+    rows = Follow.objects.filter(author__recipes__isnull=False).values_list(
+        'user_id', 'author_id', 'author__recipes__id',
+        'author__recipes__pub_date'
+    ).iterator()
+    while batch := list(islice(rows, BATCH_SIZE)):
+        TimelineEntry.objects.bulk_create(
+            (TimelineEntry(user_id=user_id, author_id=author_id,
+                           recipe_id=recipe_id, pub_date=pub_date)
+             for user_id, author_id, recipe_id, pub_date in batch),
+            ignore_conflicts=True
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0017_shopping_list_export'),
+        ('users', '0010_follow_constraints'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='recipes.recipe')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Записи ленты',
+                'ordering': ['user', '-pub_date'],
+                'indexes': [models.Index(fields=['user', '-pub_date', '-recipe'], name='timeline_user_pub_date_idx'), models.Index(fields=['user', 'author'], name='timeline_user_author_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_timeline_entry'),
+        ),
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
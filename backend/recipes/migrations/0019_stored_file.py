@@ -0,0 +1,49 @@
+# Generated by Django 5.0.7 on 2026-10-18 06:49
+
+from collections import Counter
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_stored_files(apps, schema_editor):
+    StoredFile = apps.get_model('recipes', 'StoredFile')
+    references = Counter()
+    for model, field in (
+        (apps.get_model('recipes', 'Recipe'), 'image'),
+        (apps.get_model(settings.AUTH_USER_MODEL), 'avatar'),
+    ):
+        references.update(
+            model.objects.exclude(**{field: ''})
+            .exclude(**{f'{field}__isnull': True})
+            .values_list(field, flat=True)
+        )
+    StoredFile.objects.bulk_create(
+        StoredFile(name=name, references=count)
+        for name, count in references.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0018_timeline_entry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Имя файла')),
+                ('references', models.PositiveIntegerField(default=0, verbose_name='Число ссылок')),
+            ],
+            options={
+                'verbose_name': 'Файл',
+                'verbose_name_plural': 'Файлы',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.RunPython(fill_stored_files, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.7 on 2026-10-18 07:32
+
+from django.db import migrations, models
+
+
+def requeue_running_exports(apps, schema_editor):
+    apps.get_model('recipes', 'ShoppingListExport').objects.filter(
+        status='running'
+    ).update(status='pending')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0019_stored_file'),
+    ]
+
+    operations = [
+        migrations.RunPython(requeue_running_exports,
+                             migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='shoppinglistexport',
+            name='status',
+            field=models.CharField(choices=[('pending', 'В очереди'), ('done', 'Готово'), ('failed', 'Ошибка')], default='pending', max_length=16, verbose_name='Статус'),
+        ),
+    ]
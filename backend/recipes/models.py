@@ -1,10 +1,15 @@
+from uuid import uuid4
+
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
 from django.db import models
 
-from recipes.constants import (LINK_MAX_LENGTH, MEASUREMENT_UNIT_MAX_LENGTH,
+from recipes.constants import (EXPORT_HASH_LENGTH, EXPORT_STATUS_MAX_LENGTH,
+                               LINK_MAX_LENGTH, MEASUREMENT_UNIT_MAX_LENGTH,
                                MIN_POSITIVE_VALUE, NAME_MAX_LENGTH,
-                               RECIPE_NAME_MAX_LENGTH, TAG_NAME_MAX_LENGTH)
+                               RECIPE_NAME_MAX_LENGTH,
+                               STORED_FILE_NAME_MAX_LENGTH,
+                               TAG_NAME_MAX_LENGTH)
 
 User = get_user_model()
 
@@ -15,6 +20,11 @@ class Ingredient(models.Model):
     measurement_unit = models.CharField(
         max_length=MEASUREMENT_UNIT_MAX_LENGTH
     )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True,
+        db_index=True
+    )
 
     class Meta:
         ordering = ['name']
@@ -54,10 +64,28 @@ class Recipe(models.Model):
         verbose_name='Дата публикации',
         auto_now_add=True
     )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True
+    )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Число добавлений в избранное',
+        default=0
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        verbose_name='Число добавлений в корзину',
+        default=0
+    )
 
     class Meta:
         default_related_name = 'recipes'
         ordering = ['-pub_date']
+        indexes = (
+            models.Index(fields=('-pub_date', '-id'),
+                         name='recipe_pub_date_id_idx'),
+            models.Index(fields=('author', '-pub_date'),
+                         name='recipe_author_pub_date_idx'),
+        )
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
 
@@ -69,6 +97,11 @@ class Tag(models.Model):
     name = models.CharField(max_length=TAG_NAME_MAX_LENGTH)
     slug = models.SlugField(max_length=TAG_NAME_MAX_LENGTH,
                             unique=True)
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True,
+        db_index=True
+    )
 
     class Meta:
         ordering = ['name']
@@ -136,6 +169,12 @@ class IngredientRecipe(models.Model):
         default_related_name = 'ingredient_recipe_set'
         verbose_name = 'Ингредиент в рецепте'
         verbose_name_plural = 'Ингредиенты в рецепте'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('recipe', 'ingredient'),
+                name='unique_recipe_ingredient'
+            ),
+        )
 
     def __str__(self):
         return (f'{self.ingredient} в рецепте "{self.recipe} '
@@ -153,3 +192,104 @@ class ShortLink(models.Model):
 
     def __str__(self):
         return self.link
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE)
+    amount = models.PositiveIntegerField(verbose_name='Количество')
+
+    class Meta:
+        ordering = ['user', 'ingredient']
+        default_related_name = 'shopping_list_items'
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Список покупок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_list_item'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.ingredient} для {self.user} - {self.amount}'
+
+
+class ShoppingListExport(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'В очереди'
+        DONE = 'done', 'Готово'
+        FAILED = 'failed', 'Ошибка'
+
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    cart_hash = models.CharField(max_length=EXPORT_HASH_LENGTH,
+                                 db_index=True,
+                                 verbose_name='Хэш корзины')
+    status = models.CharField(max_length=EXPORT_STATUS_MAX_LENGTH,
+                              choices=Status.choices,
+                              default=Status.PENDING,
+                              verbose_name='Статус')
+    error = models.TextField(blank=True, verbose_name='Ошибка')
+    created_at = models.DateTimeField(auto_now_add=True,
+                                      verbose_name='Дата создания')
+    updated_at = models.DateTimeField(auto_now=True,
+                                      verbose_name='Дата изменения')
+
+    class Meta:
+        ordering = ['-created_at']
+        default_related_name = 'shopping_list_exports'
+        verbose_name = 'Выгрузка списка покупок'
+        verbose_name_plural = 'Выгрузки списков покупок'
+
+    def __str__(self):
+        return f'{self.user} - {self.get_status_display()}'
+
+    @property
+    def file_name(self):
+        return f'{self.cart_hash}.pdf'
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name='timeline_entries')
+    author = models.ForeignKey(User, on_delete=models.CASCADE,
+                               related_name='+')
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE,
+                               related_name='timeline_entries')
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        ordering = ['user', '-pub_date']
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_timeline_entry'
+            ),
+        )
+        indexes = (
+            models.Index(fields=('user', '-pub_date', '-recipe'),
+                         name='timeline_user_pub_date_idx'),
+            models.Index(fields=('user', 'author'),
+                         name='timeline_user_author_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.recipe} в ленте {self.user}'
+
+
+class StoredFile(models.Model):
+    name = models.CharField('Имя файла',
+                            max_length=STORED_FILE_NAME_MAX_LENGTH,
+                            unique=True)
+    references = models.PositiveIntegerField('Число ссылок', default=0)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = 'Файл'
+        verbose_name_plural = 'Файлы'
+
+    def __str__(self):
+        return f'{self.name} ({self.references})'
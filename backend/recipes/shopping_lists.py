@@ -0,0 +1,126 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F, Sum
+
+from recipes.models import (IngredientRecipe, ShoppingCart, ShoppingListItem,
+                            User)
+
+
+def shopping_list_totals(ingredient_recipe_model, user_ids=None):
+    queryset = ingredient_recipe_model.objects.filter(
+        recipe__shopping_carts__isnull=False
+    )
+    if user_ids is not None:
+        queryset = queryset.filter(recipe__shopping_carts__user__in=user_ids)
+    return {
+        (row['user_id'], row['ingredient_id']): row['total']
+        for row in queryset.values(
+            'ingredient_id', user_id=F('recipe__shopping_carts__user')
+        ).annotate(total=Sum('amount')).order_by()
+    }
+
+
+def shopping_list_items(item_model, user_ids=None):
+    queryset = item_model.objects.all()
+    if user_ids is not None:
+        queryset = queryset.filter(user__in=user_ids)
+    return {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount in queryset.values_list(
+            'user_id', 'ingredient_id', 'amount'
+        )
+    }
+
+
+def rebuild_shopping_lists(item_model, ingredient_recipe_model,
+                           user_ids=None):
+    with transaction.atomic():
+        queryset = item_model.objects.all()
+        if user_ids is not None:
+            queryset = queryset.filter(user__in=user_ids)
+        queryset.delete()
+        return len(item_model.objects.bulk_create(
+            item_model(user_id=user_id, ingredient_id=ingredient_id,
+                       amount=amount)
+            for (user_id, ingredient_id), amount in shopping_list_totals(
+                ingredient_recipe_model, user_ids
+            ).items()
+        ))
+
+
+def user_shopping_list(user):
+    return ShoppingListItem.objects.filter(user=user).values(
+        'ingredient__name',
+        'ingredient__measurement_unit',
+        'amount'
+    ).order_by('ingredient__name')
+
+
+def recipe_amounts(recipe_id):
+    return Counter(dict(
+        IngredientRecipe.objects.filter(recipe_id=recipe_id)
+        .values_list('ingredient_id', 'amount')
+    ))
+
+
+def recipes_amounts(recipe_ids):
+    return Counter(dict(
+        IngredientRecipe.objects.filter(recipe_id__in=recipe_ids)
+        .values('ingredient_id').annotate(total=Sum('amount')).order_by()
+        .values_list('ingredient_id', 'total')
+    ))
+
+
+def lock_users(user_ids):
+    return list(
+        User.objects.select_for_update().filter(pk__in=user_ids)
+        .order_by('pk').values_list('pk', flat=True)
+    )
+
+
+def change_shopping_lists(user_ids, deltas):
+    deltas = {
+        ingredient_id: delta
+        for ingredient_id, delta in deltas.items() if delta
+    }
+    user_ids = sorted(set(user_ids))
+    if not deltas or not user_ids:
+        return
+    with transaction.atomic():
+        lock_users(user_ids)
+        items = {
+            (item.user_id, item.ingredient_id): item
+            for item in ShoppingListItem.objects.filter(
+                user__in=user_ids, ingredient__in=deltas
+            )
+        }
+        created, changed, emptied = [], [], []
+        for user_id in user_ids:
+            for ingredient_id, delta in deltas.items():
+                item = items.get((user_id, ingredient_id))
+                if item is None:
+                    if delta > 0:
+                        created.append(ShoppingListItem(
+                            user_id=user_id, ingredient_id=ingredient_id,
+                            amount=delta
+                        ))
+                    continue
+                item.amount += delta
+                if item.amount > 0:
+                    changed.append(item)
+                else:
+                    emptied.append(item.pk)
+        ShoppingListItem.objects.bulk_create(created)
+        ShoppingListItem.objects.bulk_update(changed, ['amount'])
+        ShoppingListItem.objects.filter(pk__in=emptied).delete()
+
+
+def change_recipe_shopping_lists(recipe_id, old_amounts):
+    deltas = recipe_amounts(recipe_id)
+    deltas.subtract(old_amounts)
+    change_shopping_lists(
+        ShoppingCart.objects.filter(recipe_id=recipe_id)
+        .values_list('user_id', flat=True),
+        deltas
+    )
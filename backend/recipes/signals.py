@@ -0,0 +1,150 @@
+from django.core.cache import cache
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from recipes.constants import TAG_IDS_CACHE_KEY
+from recipes.counters import change_counter
+from recipes.media_files import (get_saved_file_name, is_file_saved,
+                                 release_file, remember_saved_file,
+                                 track_file_change)
+from recipes.models import (Favorite, Ingredient, IngredientRecipe, Recipe,
+                            ShoppingCart, Tag, User)
+from recipes.shopping_lists import change_shopping_lists, recipe_amounts
+from recipes.timelines import backfill_timeline, clear_timeline, fan_out_recipe
+from recipes.user_recipes import (RECIPE_COUNTERS, defer_user_recipe_change,
+                                  is_change_deferred)
+from users.models import Follow
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def touch_tag_recipes(sender, instance, **kwargs):
+    Recipe.objects.filter(tags=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def reset_tag_ids(sender, **kwargs):
+    cache.delete(TAG_IDS_CACHE_KEY)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def touch_ingredient_recipes(sender, instance, **kwargs):
+    Recipe.objects.filter(ingredients=instance).update(
+        updated_at=timezone.now()
+    )
+
+
+@receiver(pre_save, sender=IngredientRecipe)
+def remember_ingredient_recipe(sender, instance, **kwargs):
+    instance._saved_recipe_id = None if instance._state.adding else (
+        IngredientRecipe.objects.filter(pk=instance.pk)
+        .values_list('recipe_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=IngredientRecipe)
+@receiver(post_delete, sender=IngredientRecipe)
+def touch_ingredient_recipe(sender, instance, **kwargs):
+    recipe_ids = {instance.recipe_id,
+                  instance.__dict__.pop('_saved_recipe_id', None)}
+    Recipe.objects.filter(pk__in=recipe_ids - {None}).update(
+        updated_at=timezone.now()
+    )
+
+
+@receiver(post_save, sender=User)
+def touch_author_recipes(sender, instance, created, update_fields,
+                         **kwargs):
+    if created or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    Recipe.objects.filter(author=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def increment_recipe_counter(sender, instance, created, **kwargs):
+    if created:
+        change_counter(Recipe.objects.filter(pk=instance.recipe_id),
+                       RECIPE_COUNTERS[sender], 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def decrement_recipe_counter(sender, instance, **kwargs):
+    if defer_user_recipe_change(sender, instance, -1):
+        return
+    change_counter(Recipe.objects.filter(pk=instance.recipe_id),
+                   RECIPE_COUNTERS[sender], -1)
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User.objects.filter(pk=instance.author_id),
+                       'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(sender, instance, **kwargs):
+    change_counter(User.objects.filter(pk=instance.author_id),
+                   'recipes_count', -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_list(sender, instance, created, **kwargs):
+    if created:
+        change_shopping_lists((instance.user_id,),
+                              recipe_amounts(instance.recipe_id))
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_from_shopping_list(sender, instance, **kwargs):
+    if is_change_deferred():
+        return
+    change_shopping_lists((instance.user_id,), {
+        ingredient_id: -amount
+        for ingredient_id, amount in recipe_amounts(
+            instance.recipe_id
+        ).items()
+    })
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_new_recipe(sender, instance, created, **kwargs):
+    if created:
+        fan_out_recipe(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_follower_timeline(sender, instance, created, **kwargs):
+    if created:
+        backfill_timeline(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def clear_follower_timeline(sender, instance, **kwargs):
+    clear_timeline(instance.user_id, instance.author_id)
+
+
+@receiver(pre_save, sender=Recipe)
+@receiver(pre_save, sender=User)
+def remember_stored_file(sender, instance, update_fields, **kwargs):
+    if is_file_saved(instance, update_fields):
+        remember_saved_file(instance)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=User)
+def count_stored_file(sender, instance, update_fields, **kwargs):
+    if is_file_saved(instance, update_fields):
+        track_file_change(instance)
+
+
+@receiver(pre_delete, sender=Recipe)
+@receiver(pre_delete, sender=User)
+def release_stored_file(sender, instance, **kwargs):
+    release_file(get_saved_file_name(instance))
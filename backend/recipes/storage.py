@@ -0,0 +1,67 @@
+import hashlib
+import os
+import posixpath
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+from recipes.constants import IMAGE_VARIANT_FORMAT, IMAGE_VARIANTS
+
+CONTENT_HASH_NAME = re.compile(r'[0-9a-f]{64}(?:\.\w+)?')
+
+
+def get_variant_name(name, size):
+    root, _ = os.path.splitext(name)
+    return f'{root}.{size}.{IMAGE_VARIANT_FORMAT}'
+
+
+def is_content_hash_name(name):
+    return CONTENT_HASH_NAME.fullmatch(posixpath.basename(name)) is not None
+
+
+def get_content_hash(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+class ContentHashStorage(FileSystemStorage):
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        directory, file_name = posixpath.split(name.replace('\\', '/'))
+        extension = os.path.splitext(file_name)[1].lower()
+        name = posixpath.join(
+            directory, f'{get_content_hash(content)}{extension}'
+        )
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
+
+    def get_available_name(self, name, max_length=None):
+        if is_content_hash_name(name):
+            return name
+        return super().get_available_name(name, max_length)
+
+    def _save(self, name, content):
+        if not is_content_hash_name(name):
+            return super()._save(name, content)
+        temp_path = self.path(super()._save(f'{name}.tmp', content))
+        try:
+            os.link(temp_path, self.path(name))
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(temp_path)
+        return name
+
+    def delete(self, name):
+        super().delete(name)
+        for size in IMAGE_VARIANTS:
+            super().delete(get_variant_name(name, size))
@@ -0,0 +1,40 @@
+from itertools import islice
+
+from recipes.constants import TIMELINE_BATCH_SIZE
+from recipes.models import Recipe, TimelineEntry
+from users.models import Follow
+
+
+def create_entries(entry_model, rows):
+    rows = iter(rows)
+    created = 0
+    while batch := list(islice(rows, TIMELINE_BATCH_SIZE)):
+        entry_model.objects.bulk_create(
+            (entry_model(user_id=user_id, author_id=author_id,
+                         recipe_id=recipe_id, pub_date=pub_date)
+             for user_id, author_id, recipe_id, pub_date in batch),
+            ignore_conflicts=True
+        )
+        created += len(batch)
+    return created
+
+
+def fan_out_recipe(recipe):
+    return create_entries(TimelineEntry, (
+        (user_id, recipe.author_id, recipe.pk, recipe.pub_date)
+        for user_id in Follow.objects.filter(author_id=recipe.author_id)
+        .values_list('user_id', flat=True).iterator()
+    ))
+
+
+def backfill_timeline(user_id, author_id):
+    return create_entries(TimelineEntry, (
+        (user_id, author_id, recipe_id, pub_date)
+        for recipe_id, pub_date in Recipe.objects.filter(author_id=author_id)
+        .values_list('pk', 'pub_date').iterator()
+    ))
+
+
+def clear_timeline(user_id, author_id):
+    return TimelineEntry.objects.filter(user_id=user_id,
+                                        author_id=author_id).delete()[0]
@@ -0,0 +1,105 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from threading import local
+
+from django.db import IntegrityError, transaction
+
+from recipes.counters import change_counter, delete_counted
+from recipes.models import Favorite, Recipe, ShoppingCart
+from recipes.shopping_lists import (change_shopping_lists, lock_users,
+                                    recipes_amounts)
+
+RECIPE_COUNTERS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'shopping_cart_count',
+}
+
+deferred_changes = local()
+
+
+def apply_user_recipes_change(model, user_id, recipe_ids, sign):
+    if not recipe_ids:
+        return
+    change_counter(Recipe.objects.filter(pk__in=recipe_ids),
+                   RECIPE_COUNTERS[model], sign)
+    if model is ShoppingCart:
+        change_shopping_lists((user_id,), {
+            ingredient_id: sign * amount
+            for ingredient_id, amount in recipes_amounts(recipe_ids).items()
+        })
+
+
+def is_change_deferred():
+    return getattr(deferred_changes, 'changes', None) is not None
+
+
+def defer_user_recipe_change(model, instance, sign):
+    if not is_change_deferred():
+        return False
+    deferred_changes.changes[model, instance.user_id, sign].append(
+        instance.recipe_id
+    )
+    return True
+
+
+@contextmanager
+def collect_user_recipe_changes():
+    deferred_changes.changes = defaultdict(list)
+    try:
+        yield
+        changes = deferred_changes.changes
+    finally:
+        deferred_changes.changes = None
+    for (model, user_id, sign), recipe_ids in changes.items():
+        apply_user_recipes_change(model, user_id, recipe_ids, sign)
+
+
+def insert_user_recipes(model, user, recipe_ids):
+    try:
+        with transaction.atomic():
+            model.objects.bulk_create(
+                model(user=user, recipe_id=recipe_id)
+                for recipe_id in recipe_ids
+            )
+        return recipe_ids
+    except IntegrityError:
+        pass
+    inserted = []
+    for recipe_id in recipe_ids:
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create([model(user=user,
+                                                 recipe_id=recipe_id)])
+        except IntegrityError:
+            continue
+        inserted.append(recipe_id)
+    return inserted
+
+
+def add_user_recipes(model, user, recipe_ids):
+    with transaction.atomic():
+        lock_users((user.pk,))
+        present = set(
+            model.objects.filter(user=user, recipe_id__in=recipe_ids)
+            .values_list('recipe_id', flat=True)
+        )
+        added = insert_user_recipes(model, user, [
+            recipe_id for recipe_id in recipe_ids if recipe_id not in present
+        ])
+        apply_user_recipes_change(model, user.pk, added, 1)
+    return added
+
+
+def remove_user_recipe(model, user, recipe_id):
+    return delete_counted(
+        model.objects.filter(user=user, recipe_id=recipe_id), (user.pk,)
+    )
+
+
+def remove_user_recipes(model, user, recipe_ids):
+    with transaction.atomic(), collect_user_recipe_changes():
+        lock_users((user.pk,))
+        queryset = model.objects.filter(user=user, recipe_id__in=recipe_ids)
+        removed = list(queryset.values_list('recipe_id', flat=True))
+        queryset.delete()
+    return removed
@@ -1,6 +1,5 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from django.db.models import Count
 
 from .models import User
 
@@ -10,18 +9,11 @@ class UserAdmin(BaseUserAdmin):
     search_fields = ['username', 'email']
     list_display = ['username', 'email', 'recipe_count', 'follower_count']
 
-    def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        queryset = queryset.annotate(
-            recipe_count=Count('recipes'),
-            follower_count=Count('following')
-        )
-        return queryset
-
-    @admin.display(description='Number of Recipes')
+    @admin.display(description='Number of Recipes', ordering='recipes_count')
     def recipe_count(self, obj):
-        return obj.recipe_count
+        return obj.recipes_count
 
-    @admin.display(description='Number of Followers')
+    @admin.display(description='Number of Followers',
+                   ordering='followers_count')
     def follower_count(self, obj):
-        return obj.follower_count
+        return obj.followers_count
@@ -0,0 +1,50 @@
+# Generated by Django 5.0.7 on 2026-10-18 06:18
+
+from django.db import migrations, models
+from django.db.models import Count, F, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def remove_invalid_follows(apps, schema_editor):
+    Follow = apps.get_model('users', 'Follow')
+    Follow.objects.filter(user=F('author')).delete()
+    duplicates = Follow.objects.values('user', 'author').annotate(
+        first=Min('id'), count=Count('id')
+    ).filter(count__gt=1)
+    for duplicate in duplicates:
+        Follow.objects.filter(
+            user=duplicate['user'], author=duplicate['author']
+        ).exclude(id=duplicate['first']).delete()
+    apps.get_model('users', 'User').objects.update(
+        followers_count=Coalesce(
+            Subquery(
+                Follow.objects.filter(author=OuterRef('pk'))
+                .order_by()
+                .values('author')
+                .annotate(count=Count('pk'))
+                .values('count')
+            ),
+            0
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_user_counters'),
+        ('recipes', '0015_index_pack'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_invalid_follows,
+                             migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.CheckConstraint(check=models.Q(('user', models.F('author')), _negated=True), name='prevent_self_follow'),
+        ),
+    ]
@@ -27,6 +27,18 @@ class User(AbstractUser):
         upload_to='avatars/',
         null=True,
         blank=True)
+    recipes_count = models.PositiveIntegerField(
+        'Число рецептов',
+        default=0
+    )
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков',
+        default=0
+    )
+    token_version = models.PositiveIntegerField(
+        'Версия токенов',
+        default=0
+    )
 
     class Meta:
         ordering = ['username']
@@ -53,6 +65,16 @@ class Follow(models.Model):
         ordering = ['user']
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'),
+                name='unique_follow'
+            ),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F('author')),
+                name='prevent_self_follow'
+            ),
+        )
 
     def __str__(self):
         return f'"{self.user}" добавил в подписки "{self.author}"'